@@ -0,0 +1,362 @@
+import bisect
+import argparse
+import difflib
+import os
+import re
+import unicodedata
+
+import serialization
+
+LOCATIONS_PATH = "locations/all_locations.json"
+INDEX_PATH = "locations/area_index.json"
+FUZZY_CUTOFF = 0.75
+
+
+def normalize(text):
+    """
+    Fold a name into the form used for index keys.
+
+    Accents are stripped, everything is lowercased and runs of
+    non-alphanumeric characters collapse to a single space, so that
+    "Zürich", "zurich" and "ZURICH " all produce the same key.
+
+    :param text: The raw area name, urlName or query.
+    :return: The normalized key.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+def trigrams(key):
+    """
+    Split a normalized key into padded character trigrams for fuzzy matching.
+
+    :param key: A normalized key.
+    :return: A set of trigrams.
+    """
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def area_keys(area):
+    """
+    All index keys for an area: its name, its urlName and the space-free
+    form of the name (RA url names are usually the name with spaces removed).
+
+    :param area: An area dict in the all_locations.json format.
+    :return: A set of normalized keys.
+    """
+    name = normalize(area["name"])
+    keys = {name, name.replace(" ", ""), normalize(area.get("urlName", ""))}
+    keys.discard("")
+    return keys
+
+
+class AreaIndex:
+    """
+    An offline lookup index over RA areas.
+
+    Keys are kept in a sorted list so prefix search is a bisect range scan,
+    and a trigram map narrows fuzzy candidates before they are scored.
+    """
+
+    def __init__(self, areas=None, keys=None, grams=None):
+        self.areas = {}
+        self.keys = keys or []
+        self.grams = grams or {}
+
+        if keys is None:
+            for area in areas or []:
+                self.add_area(area)
+        else:
+            self.areas = {area["id"]: area for area in areas or []}
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """
+        Load a prebuilt index from disk.
+
+        :param path: The index file path. (default: "locations/area_index.json")
+        :return: An AreaIndex.
+        """
+        data = serialization.load(path)
+
+        keys = [tuple(entry) for entry in data["keys"]]
+        return cls(list(data["areas"].values()), keys, data["trigrams"])
+
+    @classmethod
+    def build(cls, locations_path=LOCATIONS_PATH):
+        """
+        Build a fresh index from an all_locations.json file.
+
+        :param locations_path: The locations file. (default: "locations/all_locations.json")
+        :return: An AreaIndex.
+        """
+        return cls(serialization.load(locations_path))
+
+    def save(self, path=INDEX_PATH):
+        data = {
+            "areas": self.areas,
+            "keys": self.keys,
+            "trigrams": self.grams,
+        }
+
+        serialization.dump(data, path, pretty=False, atomic=True)
+
+    def add_area(self, area):
+        """
+        Insert or replace a single area, updating only the keys it touches.
+
+        :param area: An area dict in the all_locations.json format.
+        :return: True if the index changed.
+        """
+        area_id = str(area["id"])
+        area = dict(area, id=area_id)
+
+        old = self.areas.get(area_id)
+        if old == area:
+            return False
+        if old:
+            self.remove_area(area_id)
+
+        self.areas[area_id] = area
+        for key in area_keys(area):
+            bisect.insort(self.keys, (key, area_id))
+            for gram in trigrams(key):
+                self.grams.setdefault(gram, []).append(area_id)
+
+        return True
+
+    def remove_area(self, area_id):
+        area = self.areas.pop(area_id)
+        for key in area_keys(area):
+            idx = bisect.bisect_left(self.keys, (key, area_id))
+            if idx < len(self.keys) and self.keys[idx] == (key, area_id):
+                del self.keys[idx]
+            for gram in trigrams(key):
+                ids = self.grams.get(gram, [])
+                if area_id in ids:
+                    ids.remove(area_id)
+
+    def _matches_country(self, area_id, country):
+        if not country:
+            return True
+        return self.areas[area_id]["country"]["urlCode"].lower() == country.lower()
+
+    def exact(self, name, country=None):
+        """
+        Areas whose name or urlName matches exactly (after normalization).
+
+        :param name: The query.
+        :param country: Optional country code to restrict to (e.g. "de").
+        :return: A list of areas.
+        """
+        results = []
+        for key in {normalize(name), normalize(name).replace(" ", "")}:
+            idx = bisect.bisect_left(self.keys, (key, ""))
+            while idx < len(self.keys) and self.keys[idx][0] == key:
+                area_id = self.keys[idx][1]
+                if self._matches_country(area_id, country) and self.areas[area_id] not in results:
+                    results.append(self.areas[area_id])
+                idx += 1
+        return results
+
+    def prefix(self, text, country=None, limit=10):
+        """
+        Areas with a key starting with the given text.
+
+        :param text: The prefix.
+        :param country: Optional country code to restrict to.
+        :param limit: Maximum number of results. (default: 10)
+        :return: A list of areas, ordered by key.
+        """
+        key = normalize(text)
+        results = []
+        seen = set()
+
+        idx = bisect.bisect_left(self.keys, (key, ""))
+        while idx < len(self.keys) and self.keys[idx][0].startswith(key):
+            area_id = self.keys[idx][1]
+            if area_id not in seen and self._matches_country(area_id, country):
+                seen.add(area_id)
+                results.append(self.areas[area_id])
+                if len(results) >= limit:
+                    break
+            idx += 1
+        return results
+
+    def fuzzy(self, text, country=None, limit=5, cutoff=FUZZY_CUTOFF):
+        """
+        Areas whose name approximately matches the given text.
+
+        :param text: The query, possibly misspelled.
+        :param country: Optional country code to restrict to.
+        :param limit: Maximum number of results. (default: 5)
+        :param cutoff: Minimum similarity ratio between 0 and 1. (default: 0.75)
+        :return: A list of (score, area) tuples, best first.
+        """
+        key = normalize(text)
+        counts = {}
+        for gram in trigrams(key):
+            for area_id in self.grams.get(gram, []):
+                if self._matches_country(area_id, country):
+                    counts[area_id] = counts.get(area_id, 0) + 1
+
+        # Only score the candidates sharing the most trigrams with the query
+        candidates = sorted(counts, key=counts.get, reverse=True)[:50]
+
+        scored = []
+        for area_id in candidates:
+            area = self.areas[area_id]
+            score = max(
+                difflib.SequenceMatcher(None, key, area_key).ratio()
+                for area_key in area_keys(area)
+            )
+            if score >= cutoff:
+                scored.append((round(score, 3), area))
+
+        scored.sort(key=lambda item: (-item[0], item[1]["name"]))
+        return scored[:limit]
+
+    def lookup(self, name, country=None):
+        """
+        Resolve a name to a single area: exact match first, then an
+        unambiguous prefix match, then the best fuzzy match.
+
+        :param name: The city/area name.
+        :param country: Optional country code.
+        :return: An area dict, or None.
+        """
+        matches = self.exact(name, country)
+        if matches:
+            return matches[0]
+
+        matches = self.prefix(name, country, limit=2)
+        if len(matches) == 1:
+            return matches[0]
+
+        matches = self.fuzzy(name, country, limit=1)
+        if matches:
+            return matches[0][1]
+
+        return None
+
+
+def update_index(areas, path=INDEX_PATH):
+    """
+    Merge areas into the on-disk index, creating it if needed.
+
+    :param areas: An iterable of areas in the all_locations.json format.
+    :param path: The index file path. (default: "locations/area_index.json")
+    :return: The number of areas added or changed.
+    """
+    index = AreaIndex.load(path) if os.path.isfile(path) else AreaIndex()
+
+    changed = sum(index.add_area(area) for area in areas)
+    if changed or not os.path.isfile(path):
+        index.save(path)
+
+    return changed
+
+
+def resolve(name, country=None, index=None, path=INDEX_PATH, remote=True):
+    """
+    Resolve a city name to an area, offline where possible.
+
+    The remote GraphQL query is only made on an index miss, and its result
+    is added to the index so the next lookup is local.
+
+    :param name: The city/area name.
+    :param country: Optional country code.
+    :param index: An already loaded AreaIndex, to avoid reloading it per call.
+    :param path: The index file path. (default: "locations/area_index.json")
+    :param remote: Whether to query ra.co on a miss. (default: True)
+    :return: An area dict, or None.
+    """
+    if index is None:
+        index = AreaIndex.load(path) if os.path.isfile(path) else AreaIndex.build()
+
+    area = index.lookup(name, country)
+    if area or not remote:
+        return area
+
+    from get_area_code import fetch_area
+
+    area = fetch_area(normalize(name).replace(" ", ""), country)
+    if area:
+        index.add_area(area)
+        index.save(path)
+
+    return area
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build and query the offline RA area lookup index."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the index from a locations file.")
+    build_parser.add_argument(
+        "-l",
+        "--locations",
+        type=str,
+        default=LOCATIONS_PATH,
+        help=f"The locations file to index (default: {LOCATIONS_PATH}).",
+    )
+
+    lookup_parser = subparsers.add_parser("lookup", help="Resolve one or more names to areas.")
+    lookup_parser.add_argument("names", nargs="+", help="City/area names to resolve.")
+    lookup_parser.add_argument("-c", "--country", type=str, default=None, help="Country code, e.g. 'de'.")
+    lookup_parser.add_argument(
+        "-m",
+        "--mode",
+        choices=["resolve", "prefix", "fuzzy"],
+        default="resolve",
+        help="resolve: best single match; prefix/fuzzy: list candidates (default: resolve).",
+    )
+    lookup_parser.add_argument("--offline", action="store_true", help="Never query ra.co on a miss.")
+    lookup_parser.add_argument("--json", action="store_true", help="Print results as JSON lines.")
+
+    for subparser in (build_parser, lookup_parser):
+        subparser.add_argument(
+            "-i",
+            "--index",
+            type=str,
+            default=INDEX_PATH,
+            help=f"The index file path (default: {INDEX_PATH}).",
+        )
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = AreaIndex.build(args.locations)
+        index.save(args.index)
+        print(f"Indexed {len(index.areas)} areas ({len(index.keys)} keys) to {args.index}")
+        return
+
+    index = AreaIndex.load(args.index) if os.path.isfile(args.index) else AreaIndex.build()
+
+    for name in args.names:
+        if args.mode == "prefix":
+            results = [(None, area) for area in index.prefix(name, args.country)]
+        elif args.mode == "fuzzy":
+            results = index.fuzzy(name, args.country)
+        else:
+            area = resolve(name, args.country, index, args.index, remote=not args.offline)
+            results = [(None, area)] if area else []
+
+        if args.json:
+            print(serialization.dumps({"query": name, "results": [area for _, area in results]}, pretty=False))
+            continue
+
+        if not results:
+            print(f"{name}: not found")
+        for score, area in results:
+            score_text = f" (score {score})" if score is not None else ""
+            print(f"{name}: {area['name']} ({area['country']['urlCode']}) | ID: {area['id']}{score_text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+import sqlite3
+import argparse
+import glob
+import hashlib
+import os
+import sys
+import time
+
+import serialization
+from event_data import FIELDNAMES
+from export_partitions import area_key
+from refresh_scheduler import record_hash
+
+FEED_PATH = "outputs/change_feed.db"
+OUTPUTS_GLOB = "outputs/*_full.json"
+READ_LIMIT = 1000
+
+
+def field_hashes(record):
+    """
+    Short per-field content hashes, so changed fields can be listed
+    without keeping a copy of every record.
+    """
+    return {
+        field: hashlib.sha1(serialization.dumps_bytes(record.get(field), pretty=False)).hexdigest()[:12]
+        for field in FIELDNAMES
+    }
+
+
+def is_timestamp(value):
+    return isinstance(value, str) and value[:4].isdigit()
+
+
+class ChangeFeed:
+    """
+    An append-only log of inserted, updated and deleted events.
+
+    The last seen version of each event (content hash, per-field hashes and
+    date_updated) is kept by event_id. Every applied record is compared with
+    it, and real changes are appended to the log with an increasing sequence
+    number. Consumers keep a cursor and read only the changes after it.
+
+    Append-only record files (outputs/refreshed.jsonl) are applied from where
+    the previous apply stopped, so re-running apply does not replay older
+    versions of an event over newer ones.
+    """
+
+    def __init__(self, path=FEED_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS state (
+                event_id TEXT PRIMARY KEY,
+                area TEXT NOT NULL,
+                event_date TEXT,
+                content_hash TEXT NOT NULL,
+                field_hashes TEXT NOT NULL,
+                date_updated TEXT,
+                deleted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS state_area ON state (area, event_date);
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id TEXT NOT NULL,
+                area TEXT NOT NULL,
+                op TEXT NOT NULL,
+                fields TEXT NOT NULL,
+                record TEXT,
+                recorded_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS changes_event ON changes (event_id, seq);
+            CREATE TABLE IF NOT EXISTS cursors (
+                consumer TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            """
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def _log(self, event_id, area, op, fields, record=None):
+        self.conn.execute(
+            "INSERT INTO changes (event_id, area, op, fields, record, recorded_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                event_id,
+                area,
+                op,
+                serialization.dumps(fields, pretty=False),
+                None if record is None else serialization.dumps(record, pretty=False),
+                time.time(),
+            ),
+        )
+
+    def add_events(self, events):
+        """
+        Compare freshly normalized records with their previous versions and
+        log inserts and updates.
+
+        A record whose date_updated is older than the stored version's (e.g.
+        from an out-of-order worker or an old archive) is ignored. This only
+        catches edits that bump date_updated: changes such as interested
+        counts or tickets leave it as is, so applying an older copy of such a
+        record is logged as an update. Use apply_file() for record files.
+
+        :param events: An iterable of event dicts.
+        :return: A dict of "insert", "update", "unchanged" and "stale" counts.
+        """
+        with self.conn:
+            return self._compare(events)
+
+    def _compare(self, events):
+        counts = dict.fromkeys(["insert", "update", "unchanged", "stale"], 0)
+        for event in events:
+            event_id = str(event["event_id"])
+            area = area_key(event.get("area"))
+            content_hash = record_hash(event)
+            date_updated = event.get("date_updated")
+            hashes = field_hashes(event)
+
+            old = self.conn.execute("SELECT * FROM state WHERE event_id = ?", (event_id,)).fetchone()
+            if old and not old["deleted"]:
+                if old["content_hash"] == content_hash:
+                    counts["unchanged"] += 1
+                    continue
+                if is_timestamp(date_updated) and is_timestamp(old["date_updated"]) and date_updated < old["date_updated"]:
+                    counts["stale"] += 1
+                    continue
+                old_hashes = serialization.loads(old["field_hashes"])
+                op = "update"
+                fields = [field for field in FIELDNAMES if old_hashes.get(field) != hashes[field]]
+            else:
+                op = "insert"
+                fields = FIELDNAMES
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO state VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (event_id, area, event.get("event_date"), content_hash, serialization.dumps(hashes, pretty=False), date_updated),
+            )
+            self._log(event_id, area, op, fields, event)
+            counts[op] += 1
+        return counts
+
+    def apply_file(self, path):
+        """
+        Apply a detail record file.
+
+        A .jsonl file is treated as append-only: only the lines added since
+        the previous apply are read, and the new offset is saved in the same
+        transaction as the changes they produced. A file that shrank was
+        replaced, and is read from the start again. A .json file is compared
+        as a whole.
+
+        :param path: A .json or .jsonl record file.
+        :return: A dict of "insert", "update", "unchanged" and "stale" counts.
+        """
+        if not path.endswith(".jsonl"):
+            return self.add_events(serialization.load_records(path))
+
+        source = os.path.abspath(path)
+        row = self.conn.execute("SELECT offset FROM sources WHERE path = ?", (source,)).fetchone()
+        offset = row["offset"] if row else 0
+        if offset > os.path.getsize(path):
+            offset = 0
+
+        records = []
+        with open(path, "rb") as file:
+            file.seek(offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    # Still being written, read it on the next apply
+                    break
+                offset += len(line)
+                if line.strip():
+                    records.append(serialization.loads(line))
+
+        with self.conn:
+            counts = self._compare(records)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (source, offset, time.time())
+            )
+        return counts
+
+    def remove_events(self, event_ids):
+        """
+        Log deletes for events that are no longer listed.
+
+        :return: The number of deletes logged.
+        """
+        removed = 0
+        with self.conn:
+            for event_id in map(str, event_ids):
+                row = self.conn.execute(
+                    "SELECT area FROM state WHERE event_id = ? AND deleted = 0", (event_id,)
+                ).fetchone()
+                if row:
+                    self.conn.execute("UPDATE state SET deleted = 1 WHERE event_id = ?", (event_id,))
+                    self._log(event_id, row["area"], "delete", [])
+                    removed += 1
+        return removed
+
+    def sync_listing(self, area, listing):
+        """
+        Detect deletes from a fresh, complete listing of an area: tracked
+        events of that area dated within the listing's date range that it no
+        longer contains are logged as deleted.
+
+        :param area: The area name or key, e.g. "Berlin" or "newyorkcity".
+        :param listing: Listing entries in the events/*.json format.
+        :return: The number of deletes logged.
+        """
+        if not listing:
+            return 0
+
+        dates = sorted(entry["date"][:10] for entry in listing)
+        listed = {str(entry["event_id"]) for entry in listing}
+        rows = self.conn.execute(
+            "SELECT event_id FROM state WHERE area = ? AND deleted = 0 AND event_date BETWEEN ? AND ?",
+            (area_key(area), dates[0], dates[-1]),
+        )
+        return self.remove_events([row["event_id"] for row in rows if row["event_id"] not in listed])
+
+    def latest_seq(self):
+        return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def changes_since(self, seq, limit=READ_LIMIT, area=None):
+        """
+        The changes after a sequence number, in order.
+
+        :param area: Only changes for this area (optional).
+        :return: A list of {"seq", "event_id", "area", "op", "fields", "record", "recorded_at"} dicts.
+        """
+        sql = "SELECT * FROM changes WHERE seq > ?"
+        params = [seq]
+        if area:
+            sql += " AND area = ?"
+            params.append(area_key(area))
+        sql += " ORDER BY seq LIMIT ?"
+        params.append(limit)
+
+        changes = []
+        for row in self.conn.execute(sql, params):
+            change = dict(row)
+            change["fields"] = serialization.loads(change["fields"])
+            change["record"] = None if change["record"] is None else serialization.loads(change["record"])
+            changes.append(change)
+        return changes
+
+    def cursor(self, consumer):
+        row = self.conn.execute("SELECT seq FROM cursors WHERE consumer = ?", (consumer,)).fetchone()
+        return row["seq"] if row else 0
+
+    def read(self, consumer, limit=READ_LIMIT, area=None):
+        """
+        The next changes for a consumer. The cursor only moves on commit(),
+        so a consumer that fails while applying a batch reads it again.
+        """
+        return self.changes_since(self.cursor(consumer), limit, area)
+
+    def commit(self, consumer, seq):
+        """
+        Advance a consumer's cursor past seq. Cursors never move backwards.
+        """
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO cursors VALUES (?, ?, ?) ON CONFLICT (consumer) DO UPDATE"
+                " SET seq = MAX(seq, excluded.seq), updated_at = excluded.updated_at",
+                (consumer, seq, time.time()),
+            )
+
+    def consumers(self):
+        """
+        :return: A list of {"consumer", "seq", "lag", "updated_at"} dicts.
+        """
+        latest = self.latest_seq()
+        return [
+            dict(row, lag=latest - row["seq"])
+            for row in self.conn.execute("SELECT * FROM cursors ORDER BY consumer")
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Record and read a change feed of new, updated and removed events."
+    )
+    parser.add_argument("-d", "--db", type=str, default=FEED_PATH, help=f"The change feed database (default: {FEED_PATH}).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    apply_parser = subparsers.add_parser("apply", help="Compare detail records (.json or .jsonl) with the feed state."
+                                        " .jsonl files are applied from where the previous apply stopped.")
+    apply_parser.add_argument("files", nargs="*", help=f"Detail record files (default: {OUTPUTS_GLOB}).")
+
+    sync_parser = subparsers.add_parser("sync", help="Log deletes for events missing from a fresh listing file.")
+    sync_parser.add_argument("listing", type=str, help="A complete listing file, e.g. events/berlin.json.")
+    sync_parser.add_argument("-a", "--area", type=str, default=None, help="The listing's area (default: the file name).")
+
+    read_parser = subparsers.add_parser("read", help="Print a consumer's next changes as JSON lines.")
+    read_parser.add_argument("consumer", type=str)
+    read_parser.add_argument("-l", "--limit", type=int, default=READ_LIMIT)
+    read_parser.add_argument("-a", "--area", type=str, default=None, help="Only changes for this area.")
+    read_parser.add_argument("--commit", action="store_true", help="Advance the cursor past the printed changes.")
+
+    subparsers.add_parser("status", help="Show the latest sequence number and consumer lag.")
+
+    args = parser.parse_args()
+    feed = ChangeFeed(args.db)
+
+    if args.command == "apply":
+        for path in args.files or sorted(glob.glob(OUTPUTS_GLOB)):
+            counts = feed.apply_file(path)
+            print(f"{path}: " + ", ".join(f"{count} {op}" for op, count in counts.items()))
+
+    elif args.command == "sync":
+        area = args.area or args.listing.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+        print(f"Logged {feed.sync_listing(area, serialization.load(args.listing))} deletes for {area}")
+
+    elif args.command == "read":
+        changes = feed.read(args.consumer, args.limit, args.area)
+        for change in changes:
+            print(serialization.dumps(change, pretty=False))
+        if args.commit and changes:
+            feed.commit(args.consumer, changes[-1]["seq"])
+        print(f"{len(changes)} changes", file=sys.stderr)
+
+    else:
+        print(f"Latest sequence number: {feed.latest_seq()}")
+        for consumer in feed.consumers():
+            print(f"  {consumer['consumer']:<20} at {consumer['seq']} (lag {consumer['lag']})")
+
+    feed.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import requests
+import argparse
+import glob
+import os
+import time
+
+import serialization
+from area_index import resolve
+
+URL = "https://ra.co/graphql"
+HEADERS = {
+    "Content-Type": "application/json",
+    "Referer": "https://ra.co/events/",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:106.0) Gecko/20100101 Firefox/106.0",
+}
+
+STATE_PATH = "outputs/discovery_state.json"
+CITIES_PATH = "locations/cities.json"
+EVENTS_DIR = "events"
+BATCH_SIZE = 50  # Event IDs probed per aliased request
+MIN_STOP_GAP = 200  # Never stop before this many consecutive misses
+GAP_FACTOR = 3  # Stop after GAP_FACTOR x the largest recently observed gap
+MAX_GAPS = 1000  # Recent gaps kept for the stop rule
+DELAY = 2
+
+
+def generate_payload(event_ids):
+    """
+    Build one GraphQL request probing many event IDs via aliased selections.
+
+    Only the fields needed for routing are selected, so a probe is much
+    cheaper than a full GET_EVENT_DETAIL.
+
+    :param event_ids: The event IDs to probe.
+    :return: The generated payload.
+    """
+    selections = "\n".join(
+        f'  e{event_id}: event(id: "{event_id}") {{ id date contentUrl venue {{ area {{ id name }} }} }}'
+        for event_id in event_ids
+    )
+    return {
+        "operationName": "GET_EVENT_DETAIL",
+        "variables": {},
+        "query": f"query GET_EVENT_DETAIL {{\n{selections}\n}}",
+    }
+
+
+def probe(event_ids):
+    """
+    Probe a batch of event IDs.
+
+    :return: A dict of event_id -> event for the IDs that exist, or None if the request failed.
+    """
+    response = requests.post(URL, headers=HEADERS, json=generate_payload(event_ids))
+
+    try:
+        response.raise_for_status()
+        data = serialization.loads(response.content)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Error probing events: {e}")
+        return None
+
+    # Throttling, query limits and other GraphQL errors come back as "data": null, or as
+    # errors not tied to an alias; treating them as misses would skip those IDs for good
+    if not isinstance(data, dict) or not isinstance(data.get("data"), dict):
+        print(f"Error probing events: {data.get('errors') if isinstance(data, dict) else data}")
+        return None
+    query_errors = [
+        error for error in data.get("errors") or []
+        if not (error.get("path") or [None])[0] in data["data"]
+    ]
+    if query_errors:
+        print(f"Error probing events: {query_errors}")
+        return None
+
+    # Missing IDs come back as null (possibly alongside per-alias errors)
+    found = {}
+    for alias, event in data["data"].items():
+        if event:
+            found[int(alias[1:])] = event
+    return found
+
+
+def load_state(path=STATE_PATH, events_dir=EVENTS_DIR):
+    """
+    Load the discovery state, seeding the high-water mark from the
+    largest event ID in the listing files on first use.
+    """
+    if os.path.isfile(path):
+        return serialization.load(path)
+
+    high_water_mark = 0
+    for listing_path in glob.glob(os.path.join(events_dir, "*.json")):
+        high_water_mark = max([high_water_mark] + [event["event_id"] for event in serialization.load(listing_path)])
+
+    return {"high_water_mark": high_water_mark, "gaps": []}
+
+
+def save_state(state, path=STATE_PATH):
+    serialization.dump(state, path, atomic=True)
+
+
+def tracked_areas(cities_path=CITIES_PATH, events_dir=EVENTS_DIR):
+    """
+    Map area IDs to the city listing files they are routed to.
+
+    Uses locations/cities.json when present (as fetch_events.py does),
+    otherwise resolves the names of the existing events/*.json files
+    through the offline area index.
+
+    :return: A dict of area id (str) -> city name.
+    """
+    if os.path.isfile(cities_path):
+        return {str(city["area"]): city["name"] for city in serialization.load(cities_path)}
+
+    areas = {}
+    for listing_path in sorted(glob.glob(os.path.join(events_dir, "*.json"))):
+        city = os.path.splitext(os.path.basename(listing_path))[0]
+        area = resolve(city, remote=False)
+        if area:
+            areas[str(area["id"])] = city
+        else:
+            print(f"Warning: could not resolve an area for {listing_path}, not tracking it")
+    return areas
+
+
+def stop_gap(gaps):
+    """
+    How many consecutive missing IDs to tolerate before concluding we are
+    past the newest event: GAP_FACTOR x the largest recent gap between
+    consecutive existing IDs, but at least MIN_STOP_GAP.
+    """
+    return max(MIN_STOP_GAP, GAP_FACTOR * max(gaps, default=0))
+
+
+def route_events(events, areas, events_dir=EVENTS_DIR):
+    """
+    Append discovered events to the listing files of their areas,
+    in the events/*.json format, skipping IDs already listed.
+
+    :param events: Discovered events (as returned by probe).
+    :param areas: A dict of area id -> city name.
+    :return: A dict of city -> number of events added.
+    """
+    by_city = {}
+    for event in events:
+        city = areas.get(str(((event.get("venue") or {}).get("area") or {}).get("id")))
+        if city:
+            by_city.setdefault(city, []).append(event)
+
+    added = {}
+    for city, city_events in by_city.items():
+        path = os.path.join(events_dir, f"{city}.json")
+        listing = []
+        if os.path.isfile(path):
+            listing = serialization.load(path)
+
+        known = {event["event_id"] for event in listing}
+        for event in sorted(city_events, key=lambda event: int(event["id"])):
+            event_id = int(event["id"])
+            if event_id not in known:
+                listing.append({"id": len(listing), "date": event["date"], "event_id": event_id})
+                known.add(event_id)
+                added[city] = added.get(city, 0) + 1
+
+        if added.get(city):
+            serialization.dump(listing, path)
+
+    return added
+
+
+def discover(state, areas, batch_size=BATCH_SIZE, max_batches=None, lookback=0, state_path=STATE_PATH, events_dir=EVENTS_DIR):
+    """
+    Probe IDs above the high-water mark in batches until the run of missing
+    IDs exceeds the stop gap.
+
+    Each batch is routed and the state saved before the next request, so an
+    interrupted run never advances the high-water mark past unrouted events.
+
+    :param state: The discovery state (updated in place).
+    :param areas: A dict of area id -> city name to route events to.
+    :param max_batches: Stop after this many requests (optional).
+    :param lookback: Also re-probe this many IDs below the high-water mark,
+                     for events that were published late. (default: 0)
+    :param state_path: Where the state is saved after each batch.
+    :param events_dir: The listing directory events are routed to.
+    :return: (number of events found, number of requests made, dict of city -> events added).
+    """
+    next_id = max(state["high_water_mark"] - lookback, 0) + 1
+    last_found = state["high_water_mark"]
+    found_count = 0
+    requests_made = 0
+    added = {}
+
+    while next_id - last_found <= stop_gap(state["gaps"]):
+        if max_batches is not None and requests_made >= max_batches:
+            break
+
+        batch = list(range(next_id, next_id + batch_size))
+        found = probe(batch)
+        requests_made += 1
+        if found is None:
+            break
+
+        for city, count in route_events(found.values(), areas, events_dir).items():
+            added[city] = added.get(city, 0) + count
+
+        for event_id in sorted(found):
+            if event_id > last_found:
+                # The first hit after seeding from listings measures the seed's age, not a real gap
+                if state["gaps"] or state.get("probed"):
+                    state["gaps"] = (state["gaps"] + [event_id - last_found])[-MAX_GAPS:]
+                state["probed"] = True
+                last_found = event_id
+        found_count += len(found)
+
+        state["high_water_mark"] = max(state["high_water_mark"], last_found)
+        save_state(state, state_path)
+        print(f"  Probed {batch[0]}-{batch[-1]}: {len(found)} found, high-water mark {state['high_water_mark']}")
+
+        next_id += batch_size
+        time.sleep(DELAY)
+
+    return found_count, requests_made, added
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Discover newly posted events by probing event IDs above the high-water mark."
+    )
+    parser.add_argument("-b", "--batch-size", type=int, default=BATCH_SIZE, help=f"IDs per request (default: {BATCH_SIZE}).")
+    parser.add_argument("-m", "--max-batches", type=int, default=None, help="Maximum requests this run.")
+    parser.add_argument("-l", "--lookback", type=int, default=0, help="Re-probe this many IDs below the high-water mark.")
+    parser.add_argument("-s", "--state", type=str, default=STATE_PATH, help=f"The state file (default: {STATE_PATH}).")
+    parser.add_argument("-e", "--events-dir", type=str, default=EVENTS_DIR, help=f"The listing directory (default: {EVENTS_DIR}).")
+    args = parser.parse_args()
+
+    state = load_state(args.state, args.events_dir)
+    areas = tracked_areas(events_dir=args.events_dir)
+    print(f"High-water mark: {state['high_water_mark']}, stop gap: {stop_gap(state['gaps'])}")
+    print(f"Tracking {len(areas)} areas: {', '.join(sorted(areas.values()))}\n")
+
+    found_count, requests_made, added = discover(
+        state, areas, args.batch_size, args.max_batches, args.lookback, args.state, args.events_dir
+    )
+
+    print(f"\n{'='*60}")
+    print(f"Found {found_count} events in {requests_made} requests, high-water mark now {state['high_water_mark']}")
+    for city, count in sorted(added.items()):
+        print(f"  {city}: {count} new events added to {args.events_dir}/{city}.json")
+    print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,44 @@
 import os
-import json
+
+import serialization
 
 folder_path = "events"
 
-for filename in os.listdir(folder_path):
-    if filename.endswith(".json"):
-        file_path = os.path.join(folder_path, filename)
-        with open(file_path, "r") as f:
-            data = json.load(f)
 
-        seen_event_ids = set()
-        unique_data = []
+def dedupe_file(file_path):
+    """
+    Drop repeated event_ids from a listing file, keeping the first occurrence.
+
+    :return: (events before, events after).
+    """
+    data = serialization.load(file_path)
+
+    seen_event_ids = set()
+    unique_data = []
+
+    for event in data:
+        if event["event_id"] not in seen_event_ids:
+            unique_data.append(event)
+            seen_event_ids.add(event["event_id"])
+
+    serialization.dump(unique_data, file_path)
+    return len(data), len(unique_data)
+
+
+def dedupe_folder(folder_path=folder_path):
+    """
+    Deduplicate every listing file in a folder.
+
+    :return: (events before, events after) over all files.
+    """
+    before = after = 0
+    for filename in os.listdir(folder_path):
+        if filename.endswith(".json"):
+            counts = dedupe_file(os.path.join(folder_path, filename))
+            before += counts[0]
+            after += counts[1]
+    return before, after
 
-        for event in data:
-            if event["event_id"] not in seen_event_ids:
-                unique_data.append(event)
-                seen_event_ids.add(event["event_id"])
 
-        with open(file_path, "w") as f:
-            json.dump(unique_data, f, indent=4)
\ No newline at end of file
+if __name__ == "__main__":
+    dedupe_folder()
@@ -1,6 +1,10 @@
-import requests, json, argparse, re, csv
+import requests, argparse, re, csv
+import collections, contextlib, functools, itertools, os, signal, socket, socketserver, sys, threading, time
 from datetime import datetime
 
+import raw_archive
+import serialization
+
 URL = "https://ra.co/graphql"
 HEADERS = {
     "Content-Type": "application/json",
@@ -10,6 +14,27 @@ HEADERS = {
 
 QUERY_TEMPLATE_PATH = "payloads/event.json"
 DELAY = 2
+# CSV column order for normalized event records
+FIELDNAMES = ["event_id", "area", "venue", "address", "venue_url",
+              "latitude", "longitude", "timezone",
+              "event_name", "event_date", "start_time", "end_time", "event_url",
+              "poster_front", "poster_back",
+              "promoters", "promoter_url", "artists", "artist_url",
+              "interested", "ticket_category", "ticket_price",
+              "lineup", "minimum_age", "genre", "information",
+              "event_admin", "website_url", "player_links",
+              "is_festival", "date_posted", "date_updated",
+              "pick_blurb", "pick_author"]
+RESULT_TTL = 300  # Seconds a worker reuses a fetched event for repeated requests
+
+# Shared session, so repeated requests in one process reuse the HTTPS connection
+SESSION = requests.Session()
+SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=16))
+
+
+@functools.lru_cache(maxsize=1)
+def load_query_template():
+    return serialization.load(QUERY_TEMPLATE_PATH)
 
 
 class EventFetcher:
@@ -29,30 +54,55 @@ class EventFetcher:
         :param event_id: The event id for a specific party/event.
         :return: The generated payload.
         """
-        with open(QUERY_TEMPLATE_PATH, "r") as file:
-            payload = json.load(file)
+        template = load_query_template()
+        payload = dict(template, variables=dict(template["variables"]))
 
         payload["variables"]["id"] = event_id
 
         return payload
 
-    def get_event_details(self):
-        response = requests.post(URL, headers=HEADERS, json=self.payload)
+    def get_event_details(self, raise_errors=False):
+        """
+        Fetch the raw event.
+
+        :param raise_errors: Raise on failed requests (HTTP errors, throttling,
+                             invalid responses) instead of returning None, so
+                             callers can tell them apart from missing events. (default: False)
+        :return: The event, or None if it does not exist (or the request failed).
+        """
+        response = SESSION.post(URL, headers=HEADERS, json=self.payload)
 
         try:
             response.raise_for_status()
-            data = response.json()
+            data = serialization.loads(response.content)
         except (requests.exceptions.RequestException, ValueError) as e:
+            if raise_errors:
+                raise
             print(f"Error fetching event details: {e}")
             return None
 
-        if "data" not in data or not data["data"]["event"]:
+        raw_archive.safe_append("GET_EVENT_DETAIL", {"id": str(self.event_id)}, data)
+
+        if not isinstance(data, dict) or not data.get("data"):
+            if raise_errors:
+                raise ValueError(f"Invalid response for event {self.event_id}: {data.get('errors') if isinstance(data, dict) else data}")
+            print("Error: Event not found or invalid data returned.")
+            return None
+
+        if not data["data"].get("event"):
             print("Error: Event not found or invalid data returned.")
             return None
 
         return data["data"]["event"]
 
-    def save_event_to_json(self, event, output_file="default.json"):
+    @staticmethod
+    def normalize_event(event):
+        """
+        Flatten a raw GET_EVENT_DETAIL event into the output record format.
+
+        :param event: The event returned by get_event_details.
+        :return: The normalized event dict.
+        """
         def convertTime(datetime_string):
             if len(datetime_string.split(":")[-1]) == 1:
                 datetime_string = datetime_string[:-1] + "0"
@@ -161,8 +211,190 @@ class EventFetcher:
             "pick_author": pick_author,
         }
 
-        with open(output_file, "w", encoding="utf-8") as file:
-            json.dump(data, file, ensure_ascii=False, indent=4)
+        return data
+
+    def save_event_to_json(self, event, output_file="default.json"):
+        data = self.normalize_event(event)
+
+        serialization.dump(data, output_file)
+
+
+class Worker:
+    """
+    A long-lived scraper that answers event ID requests with normalized records.
+
+    Requests are JSON lines: a bare event id, {"id": 123} or {"ids": [1, 2, 3]}
+    (an optional "request_id" is echoed back). Each event produces one JSON
+    line: {"event_id": "123", "ok": true, "data": {...}} or
+    {"event_id": "123", "ok": false, "error": "..."}.
+
+    The HTTPS session, payload template and recently fetched events stay warm
+    between requests. On SIGTERM/SIGINT the worker finishes the request in
+    progress and then stops (graceful drain).
+    """
+
+    def __init__(self, result_ttl=RESULT_TTL):
+        self.result_ttl = result_ttl
+        self.results = {}
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+    def fetch(self, event_id):
+        now = time.time()
+        with self.lock:
+            cached = self.results.get(event_id)
+        if cached and now - cached[0] < self.result_ttl:
+            return cached[1]
+
+        # Failed requests raise (reported per event by handle_line) and are never cached;
+        # only records and confirmed missing events are
+        event = EventFetcher(event_id).get_event_details(raise_errors=True)
+        record = EventFetcher.normalize_event(event) if event else None
+
+        with self.lock:
+            self.results[event_id] = (now, record)
+            # Drop expired entries so a long-running worker doesn't grow without bound
+            if len(self.results) > 10000:
+                self.results = {key: value for key, value in self.results.items() if now - value[0] < self.result_ttl}
+        return record
+
+    def handle_line(self, line):
+        """
+        Process one request line.
+
+        :return: A list of response dicts.
+        """
+        try:
+            request = serialization.loads(line)
+        except ValueError:
+            return [{"ok": False, "error": f"Invalid request: {line.strip()}"}]
+
+        if not isinstance(request, dict):
+            request = {"id": request}
+        event_ids = request.get("ids") or [request.get("id")]
+
+        responses = []
+        for event_id in event_ids:
+            response = {"event_id": str(event_id)}
+            if "request_id" in request:
+                response["request_id"] = request["request_id"]
+
+            try:
+                record = self.fetch(str(int(event_id)))
+            except Exception as e:
+                response.update(ok=False, error=str(e))
+            else:
+                if record:
+                    response.update(ok=True, data=record)
+                else:
+                    response.update(ok=False, error="Event not found or invalid data returned.")
+            responses.append(response)
+
+        return responses
+
+    def serve_stream(self, instream, outstream):
+        """
+        Answer requests from instream (e.g. stdin) until EOF or shutdown.
+        Log output goes to stderr so outstream only carries JSON lines.
+        """
+        class Idle(Exception):
+            pass
+
+        # Only a worker blocked waiting for a request is interrupted; a request
+        # that has been read is always answered before the worker stops
+        reading = False
+
+        def stop(signum, frame):
+            self.stopping.set()
+            if reading:
+                raise Idle()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        lines = iter(instream)
+        # deque.extend() stores the line before a signal handler can run, so a
+        # line is never lost between being read and being handled
+        pending = collections.deque()
+        with contextlib.redirect_stdout(sys.stderr):
+            while not self.stopping.is_set():
+                reading = True
+                try:
+                    pending.extend(itertools.islice(lines, 1))
+                except Idle:
+                    pass
+                finally:
+                    reading = False
+                if not pending:
+                    break
+                line = pending.popleft()
+                if not line.strip():
+                    continue
+
+                for response in self.handle_line(line):
+                    outstream.write(serialization.dumps(response, pretty=False) + "\n")
+                outstream.flush()
+
+        print("Worker stopped.", file=sys.stderr)
+
+    def serve_socket(self, path):
+        """
+        Answer requests on a Unix socket; each connection is a JSON lines stream.
+        """
+        worker = self
+        connections = set()
+        connections_lock = threading.Lock()
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                with connections_lock:
+                    connections.add(self.connection)
+                try:
+                    while not worker.stopping.is_set():
+                        line = self.rfile.readline()
+                        if not line:
+                            break
+                        if not line.strip():
+                            continue
+                        for response in worker.handle_line(line.decode("utf-8")):
+                            self.wfile.write(serialization.dumps_bytes(response, pretty=False) + b"\n")
+                        self.wfile.flush()
+                finally:
+                    with connections_lock:
+                        connections.discard(self.connection)
+
+        if os.path.exists(path):
+            os.remove(path)
+
+        server = socketserver.ThreadingUnixStreamServer(path, Handler)
+        # Wait for in-flight connections to finish their current request on shutdown
+        server.daemon_threads = False
+        server.block_on_close = True
+
+        def stop(signum, frame):
+            self.stopping.set()
+            # Shutting down the read side wakes idle connections with EOF,
+            # while a request in progress still writes its responses
+            with connections_lock:
+                for connection in connections:
+                    try:
+                        connection.shutdown(socket.SHUT_RD)
+                    except OSError:
+                        pass
+            threading.Thread(target=server.shutdown).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        print(f"Worker listening on {path}", file=sys.stderr)
+        with contextlib.redirect_stdout(sys.stderr):
+            try:
+                server.serve_forever()
+            finally:
+                server.server_close()
+                os.remove(path)
+
+        print("Worker stopped.", file=sys.stderr)
 
 
 def main():
@@ -170,7 +402,7 @@ def main():
         description="Fetch events from ra.co and save them to a JSON file."
     )
     parser.add_argument(
-        "event_id", type=int, help="The event id to fetch event details"
+        "event_id", type=int, nargs="?", help="The event id to fetch event details"
     )
     parser.add_argument(
         "-o",
@@ -179,8 +411,39 @@ def main():
         default="default.json",
         help="The output file path (default: default.json).",
     )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Run as a long-lived worker reading event ids as JSON lines from stdin "
+             "(or --socket) and writing normalized JSON lines back.",
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        default=None,
+        help="With --worker, listen on this Unix socket path instead of stdin/stdout.",
+    )
+    parser.add_argument(
+        "--pretty",
+        action="store_true",
+        help="Indent the output file (default: compact, or RA_JSON_PRETTY=1).",
+    )
     args = parser.parse_args()
 
+    if args.pretty:
+        serialization.set_pretty(True)
+
+    if args.worker:
+        worker = Worker()
+        if args.socket:
+            worker.serve_socket(args.socket)
+        else:
+            worker.serve_stream(sys.stdin, sys.stdout)
+        return
+
+    if args.event_id is None:
+        parser.error("event_id is required unless --worker is given")
+
     event_fetcher = EventFetcher(args.event_id)
     event = event_fetcher.get_event_details()
 
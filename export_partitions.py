@@ -0,0 +1,259 @@
+import sqlite3
+import argparse
+import csv
+import glob
+import hashlib
+import io
+import os
+from datetime import datetime
+
+import serialization
+from area_index import normalize
+from event_data import FIELDNAMES
+
+EXPORT_ROOT = "outputs"
+MANIFEST_NAME = "partitions_manifest.json"
+PARTITIONS_DB_NAME = "partitions.db"
+OUTPUTS_GLOB = "outputs/*_full.json"
+PARTITION_FILE = "events.csv"
+
+
+def area_key(area):
+    """
+    The partition key for an area name, in RA urlName style ("New York City" -> "newyorkcity").
+    """
+    return normalize(area).replace(" ", "") or "unknown"
+
+
+def partition_of(record):
+    month = (record.get("event_date") or "")[:7] or "unknown"
+    return f"area={area_key(record.get('area'))}/month={month}"
+
+
+def to_row(record):
+    """
+    A record as the strings its CSV row holds, so rows read back from disk
+    and freshly scraped records compare equal.
+    """
+    return {field: "" if record.get(field) is None else str(record.get(field)) for field in FIELDNAMES}
+
+
+def render_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDNAMES, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+class PartitionedExport:
+    """
+    CSV exports partitioned by area and event month, e.g.
+    outputs/area=berlin/month=2025-03/events.csv.
+
+    Only partitions touched by new or changed events are rewritten. A manifest
+    (outputs/partitions_manifest.json) records each partition's area, month,
+    date range, row count and content hash so readers can prune partitions
+    without opening them. A small SQLite table remembers which partition each
+    event lives in, so events whose date or area changes are moved.
+    """
+
+    def __init__(self, root=EXPORT_ROOT):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+
+        if os.path.isfile(self.manifest_path):
+            self.manifest = serialization.load(self.manifest_path)
+        else:
+            self.manifest = {"partitions": {}}
+
+        self.conn = sqlite3.connect(os.path.join(root, PARTITIONS_DB_NAME))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS event_partition (event_id TEXT PRIMARY KEY, partition TEXT NOT NULL)"
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def partition_path(self, partition):
+        return os.path.join(self.root, partition, PARTITION_FILE)
+
+    def read_partition(self, partition):
+        path = self.partition_path(partition)
+        if not os.path.isfile(path):
+            return {}
+        with open(path, "r", newline="", encoding="utf-8") as file:
+            return {row["event_id"]: row for row in csv.DictReader(file)}
+
+    def write_partition(self, partition, rows):
+        """
+        Rewrite a partition if its content changed.
+
+        :return: True if the partition was written (or removed).
+        """
+        path = self.partition_path(partition)
+        rows = sorted(rows.values(), key=lambda row: (row["event_date"], row["event_id"]))
+
+        if not rows:
+            if os.path.isfile(path):
+                os.remove(path)
+            return self.manifest["partitions"].pop(partition, None) is not None
+
+        content = render_csv(rows)
+        content_hash = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        entry = self.manifest["partitions"].get(partition)
+        if entry and entry["content_hash"] == content_hash and os.path.isfile(path):
+            return False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", newline="", encoding="utf-8") as file:
+            file.write(content)
+        os.replace(tmp_path, path)
+
+        area, month = (part.split("=", 1)[1] for part in partition.split("/"))
+        self.manifest["partitions"][partition] = {
+            "area": area,
+            "area_name": rows[0]["area"],
+            "month": month,
+            "path": path,
+            "rows": len(rows),
+            "min_date": rows[0]["event_date"],
+            "max_date": rows[-1]["event_date"],
+            "content_hash": content_hash,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        return True
+
+    def save_manifest(self):
+        serialization.dump(self.manifest, self.manifest_path, atomic=True)
+
+    def _apply(self, upserts, deletes):
+        """
+        :param upserts: {partition: {event_id: row}} of rows to insert or replace.
+        :param deletes: {partition: set of event_ids} to remove.
+        :return: The number of partitions rewritten.
+        """
+        rewritten = 0
+        for partition in sorted(set(upserts) | set(deletes)):
+            rows = self.read_partition(partition)
+            for event_id in deletes.get(partition, ()):
+                rows.pop(event_id, None)
+            rows.update(upserts.get(partition, {}))
+            rewritten += self.write_partition(partition, rows)
+
+        with self.conn:
+            for partition, rows in upserts.items():
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO event_partition VALUES (?, ?)",
+                    [(event_id, partition) for event_id in rows],
+                )
+            # Moved events already point at their new partition, so this only drops removed ones
+            for partition, event_ids in deletes.items():
+                self.conn.executemany(
+                    "DELETE FROM event_partition WHERE event_id = ? AND partition = ?",
+                    [(event_id, partition) for event_id in event_ids],
+                )
+
+        self.save_manifest()
+        return rewritten
+
+    def add_events(self, events):
+        """
+        Export new or changed normalized records.
+
+        :param events: An iterable of event dicts or serialization.EventRecords.
+        :return: The number of partitions rewritten.
+        """
+        upserts = {}
+        for event in events:
+            row = to_row(event)
+            upserts.setdefault(partition_of(event), {})[row["event_id"]] = row
+
+        # Events that moved (date or area changed) are removed from their old partition
+        deletes = {}
+        for partition, rows in upserts.items():
+            for event_id in rows:
+                old = self.conn.execute(
+                    "SELECT partition FROM event_partition WHERE event_id = ?", (event_id,)
+                ).fetchone()
+                if old and old[0] != partition:
+                    deletes.setdefault(old[0], set()).add(event_id)
+
+        return self._apply(upserts, deletes)
+
+    def remove_events(self, event_ids):
+        deletes = {}
+        for event_id in map(str, event_ids):
+            old = self.conn.execute("SELECT partition FROM event_partition WHERE event_id = ?", (event_id,)).fetchone()
+            if old:
+                deletes.setdefault(old[0], set()).add(event_id)
+        return self._apply({}, deletes)
+
+    def select(self, area=None, start_date=None, end_date=None):
+        """
+        Prune partitions using only the manifest.
+
+        :param area: An area name or key, e.g. "Berlin" (optional).
+        :param start_date: Inclusive start date, YYYY-MM-DD (optional).
+        :param end_date: Inclusive end date, YYYY-MM-DD (optional).
+        :return: The matching manifest entries, ordered by area and month.
+        """
+        entries = []
+        for partition, entry in sorted(self.manifest["partitions"].items()):
+            if area and entry["area"] != area_key(area):
+                continue
+            if start_date and entry["max_date"] < start_date:
+                continue
+            if end_date and entry["min_date"] > end_date:
+                continue
+            entries.append(entry)
+        return entries
+
+    def read(self, area=None, start_date=None, end_date=None):
+        """
+        Yield rows from the partitions that can match, filtered by date.
+        """
+        for entry in self.select(area, start_date, end_date):
+            with open(entry["path"], "r", newline="", encoding="utf-8") as file:
+                for row in csv.DictReader(file):
+                    if start_date and row["event_date"] < start_date:
+                        continue
+                    if end_date and row["event_date"] > end_date:
+                        continue
+                    yield row
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export events as CSV partitioned by area and month, rewriting only changed partitions."
+    )
+    parser.add_argument("-r", "--root", type=str, default=EXPORT_ROOT, help=f"Export root directory (default: {EXPORT_ROOT}).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export detail records (.json or .jsonl).")
+    export_parser.add_argument("files", nargs="*", help=f"Detail record files (default: {OUTPUTS_GLOB}).")
+
+    list_parser = subparsers.add_parser("list", help="List partitions matching an area/date filter.")
+    list_parser.add_argument("-a", "--area", type=str, default=None)
+    list_parser.add_argument("-s", "--start-date", type=str, default=None)
+    list_parser.add_argument("-e", "--end-date", type=str, default=None)
+
+    args = parser.parse_args()
+    export = PartitionedExport(args.root)
+
+    if args.command == "export":
+        for path in args.files or sorted(glob.glob(OUTPUTS_GLOB)):
+            records = serialization.load_event_records(path)
+            rewritten = export.add_events(records)
+            print(f"{path}: {len(records)} events, {rewritten} partitions rewritten")
+        print(f"\n{len(export.manifest['partitions'])} partitions in {export.manifest_path}")
+    else:
+        for entry in export.select(args.area, args.start_date, args.end_date):
+            print(f"{entry['path']:<55} {entry['rows']:>6} rows  {entry['min_date']} to {entry['max_date']}")
+
+    export.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
-import json, os
+import os
+import serialization
 
-with open("locations/cities.json", "r") as cities_file:
-    cities = json.load(cities_file)
+cities = serialization.load("locations/cities.json")
 
 for city_data in cities:
     city = city_data["name"]
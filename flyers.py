@@ -0,0 +1,215 @@
+import requests
+import argparse
+import glob
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import urlparse
+
+import serialization
+
+FLYERS_DIR = "flyers"
+OUTPUTS_GLOB = "outputs/*_full.json"
+FLYER_FIELDS = ["poster_front", "poster_back"]
+WORKERS = 8
+SAVE_EVERY = 50  # Persist the manifest every 50 new or updated manifest entries
+HEADERS = {
+    "Referer": "https://ra.co/",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:106.0) Gecko/20100101 Firefox/106.0",
+}
+
+
+def collect_flyer_urls(events):
+    """
+    Unique flyer URLs from normalized detail records, in first-seen order.
+
+    :param events: An iterable of event dicts.
+    :return: A list of URLs.
+    """
+    urls = {}
+    for event in events:
+        for field in FLYER_FIELDS:
+            url = event.get(field)
+            if url and url != "N/A":
+                urls.setdefault(url, None)
+    return list(urls)
+
+
+class FlyerStore:
+    """
+    A content-addressed flyer store with a resumable URL -> hash manifest.
+
+    Files live at flyers/objects/<first two hex chars>/<sha256><ext>, so the
+    same image reused across events or recurring parties is stored once.
+    """
+
+    def __init__(self, root=FLYERS_DIR, workers=WORKERS):
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.workers = workers
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        if os.path.isfile(self.manifest_path):
+            self.manifest = serialization.load(self.manifest_path)
+        else:
+            self.manifest = {}
+
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.stats = {"downloaded": 0, "duplicate": 0, "not_modified": 0, "skipped": 0, "failed": 0, "bytes": 0}
+
+    def save_manifest(self):
+        with self.lock:
+            data = serialization.dumps_bytes(self.manifest)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, self.manifest_path)
+
+    def object_path(self, digest, ext):
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}{ext}")
+
+    def fetch(self, url, refresh=False):
+        """
+        Download a single flyer unless it is already stored.
+
+        With refresh=True a stored flyer is revalidated with If-None-Match /
+        If-Modified-Since and only re-downloaded if the server says it changed.
+
+        :return: The status: downloaded, duplicate, not_modified, skipped or failed.
+        """
+        with self.lock:
+            entry = self.manifest.get(url)
+
+        if entry and os.path.isfile(entry["path"]) and not refresh:
+            return "skipped"
+
+        headers = {}
+        if entry and os.path.isfile(entry["path"]):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        ext = os.path.splitext(urlparse(url).path)[1].lower() or ".bin"
+        tmp_path = os.path.join(self.root, f".{threading.get_ident()}.part")
+
+        try:
+            with self.session.get(url, headers=headers, stream=True, timeout=30) as response:
+                if response.status_code == 304:
+                    return "not_modified"
+                response.raise_for_status()
+
+                sha = hashlib.sha256()
+                size = 0
+                with open(tmp_path, "wb") as file:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        sha.update(chunk)
+                        file.write(chunk)
+                        size += len(chunk)
+
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except (requests.exceptions.RequestException, OSError) as e:
+            print(f"Error fetching {url}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return "failed"
+
+        digest = sha.hexdigest()
+        path = self.object_path(digest, ext)
+
+        if os.path.isfile(path):
+            os.remove(tmp_path)
+            status = "duplicate"
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            status = "downloaded"
+
+        with self.lock:
+            self.manifest[url] = {
+                "hash": digest,
+                "path": path,
+                "size": size,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            self.stats["bytes"] += size
+
+        return status
+
+    def download(self, urls, refresh=False):
+        """
+        Download flyers with bounded concurrency, checkpointing the manifest
+        as it goes so an interrupted run resumes where it stopped.
+
+        :param urls: An iterable of flyer URLs.
+        :param refresh: Revalidate already stored flyers. (default: False)
+        :return: The run statistics, including bytes_per_sec.
+        """
+        started = time.perf_counter()
+        completed = 0
+        unsaved = 0  # Manifest entries changed since the last checkpoint
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {executor.submit(self.fetch, url, refresh): url for url in urls}
+                for future in as_completed(futures):
+                    status = future.result()
+                    self.stats[status] += 1
+                    completed += 1
+                    unsaved += status in ("downloaded", "duplicate")
+
+                    if unsaved >= SAVE_EVERY:
+                        self.save_manifest()
+                        unsaved = 0
+                        elapsed = time.perf_counter() - started
+                        print(f"  [{completed}/{len(futures)}] {self.stats['bytes'] / elapsed / 1024:.1f} KiB/s")
+        finally:
+            self.save_manifest()
+
+        elapsed = time.perf_counter() - started
+        self.stats["seconds"] = round(elapsed, 3)
+        self.stats["bytes_per_sec"] = round(self.stats["bytes"] / elapsed, 1) if elapsed else 0.0
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Download event flyers into a content-addressed store with dedupe and resume."
+    )
+    parser.add_argument("files", nargs="*", help=f"Detail JSON files to read flyer URLs from (default: {OUTPUTS_GLOB}).")
+    parser.add_argument("-d", "--dir", type=str, default=FLYERS_DIR, help=f"The flyer store directory (default: {FLYERS_DIR}).")
+    parser.add_argument("-w", "--workers", type=int, default=WORKERS, help=f"Concurrent downloads (default: {WORKERS}).")
+    parser.add_argument("--refresh", action="store_true", help="Revalidate stored flyers with conditional requests.")
+    args = parser.parse_args()
+
+    events = []
+    for path in args.files or sorted(glob.glob(OUTPUTS_GLOB)):
+        events.extend(serialization.load(path))
+
+    urls = collect_flyer_urls(events)
+    print(f"Found {len(urls)} unique flyer URLs in {len(events)} events\n")
+
+    store = FlyerStore(args.dir, args.workers)
+    stats = store.download(urls, args.refresh)
+
+    print(f"\n{'='*60}")
+    print(f"Downloaded: {stats['downloaded']}, duplicates: {stats['duplicate']}, "
+          f"not modified: {stats['not_modified']}, skipped: {stats['skipped']}, failed: {stats['failed']}")
+    print(f"{stats['bytes']} bytes in {stats['seconds']}s ({stats['bytes_per_sec'] / 1024:.1f} KiB/s)")
+    print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    main()
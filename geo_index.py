@@ -0,0 +1,232 @@
+import sqlite3
+import argparse
+import glob
+import math
+import sys
+import time
+
+import serialization
+
+INDEX_PATH = "outputs/geo_index.db"
+OUTPUTS_GLOB = "outputs/*_full.json"
+CELL_SIZE = 0.01  # Grid cell size in degrees (~1.1 km of latitude)
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance between two points in kilometres.
+    """
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def cell(value):
+    return math.floor(value / CELL_SIZE)
+
+
+class GeoIndex:
+    """
+    A persistent grid index over venue coordinates combined with a date index.
+
+    Events are bucketed into fixed-size lat/lon cells. A radius or bounding box
+    query only reads the rows in the covering cells (via the composite index on
+    cell and date) and then filters them exactly.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                event_id TEXT PRIMARY KEY,
+                area TEXT,
+                venue TEXT,
+                event_name TEXT,
+                event_date TEXT,
+                event_url TEXT,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                cell_y INTEGER NOT NULL,
+                cell_x INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS events_cell_date ON events (cell_y, cell_x, event_date);
+            CREATE INDEX IF NOT EXISTS events_date ON events (event_date);
+            """
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def add_events(self, events):
+        """
+        Insert or update events from normalized detail records
+        (the format written by event_data.save_event_to_json).
+
+        :param events: An iterable of event dicts.
+        :return: The number of events indexed. Events without coordinates are skipped.
+        """
+        rows = []
+        for event in events:
+            try:
+                latitude = float(event["latitude"])
+                longitude = float(event["longitude"])
+            except (KeyError, TypeError, ValueError):
+                continue
+
+            rows.append((
+                str(event["event_id"]),
+                event.get("area"),
+                event.get("venue"),
+                event.get("event_name"),
+                event.get("event_date"),
+                event.get("event_url"),
+                latitude,
+                longitude,
+                cell(latitude),
+                cell(longitude),
+            ))
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+        return len(rows)
+
+    def remove_events(self, event_ids):
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM events WHERE event_id = ?", [(str(event_id),) for event_id in event_ids]
+            )
+
+    def _query_cells(self, min_lat, min_lon, max_lat, max_lon, start_date=None, end_date=None):
+        sql = (
+            "SELECT * FROM events WHERE cell_y BETWEEN ? AND ? AND cell_x BETWEEN ? AND ?"
+            " AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?"
+        )
+        params = [cell(min_lat), cell(max_lat), cell(min_lon), cell(max_lon), min_lat, max_lat, min_lon, max_lon]
+
+        if start_date:
+            sql += " AND event_date >= ?"
+            params.append(start_date)
+        if end_date:
+            sql += " AND event_date <= ?"
+            params.append(end_date)
+
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def within_bbox(self, min_lat, min_lon, max_lat, max_lon, start_date=None, end_date=None, limit=None):
+        """
+        Events inside a bounding box, optionally between two dates.
+
+        :param start_date: Inclusive start date (YYYY-MM-DD, optional).
+        :param end_date: Inclusive end date (YYYY-MM-DD, optional).
+        :param limit: Maximum number of results (optional).
+        :return: A list of event dicts ordered by date.
+        """
+        events = self._query_cells(min_lat, min_lon, max_lat, max_lon, start_date, end_date)
+        events.sort(key=lambda event: (event["event_date"] or "", event["event_id"]))
+        return events[:limit] if limit else events
+
+    def within_radius(self, latitude, longitude, radius_km, start_date=None, end_date=None, limit=None):
+        """
+        Events within radius_km of a point, optionally between two dates.
+
+        :param start_date: Inclusive start date (YYYY-MM-DD, optional).
+        :param end_date: Inclusive end date (YYYY-MM-DD, optional).
+        :param limit: Maximum number of results (optional).
+        :return: A list of event dicts with a distance_km field, nearest first.
+        """
+        lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+        lon_delta = lat_delta / max(math.cos(math.radians(latitude)), 1e-6)
+
+        events = []
+        for event in self._query_cells(
+            latitude - lat_delta, longitude - lon_delta,
+            latitude + lat_delta, longitude + lon_delta,
+            start_date, end_date,
+        ):
+            distance = haversine_km(latitude, longitude, event["latitude"], event["longitude"])
+            if distance <= radius_km:
+                event["distance_km"] = round(distance, 3)
+                events.append(event)
+
+        events.sort(key=lambda event: (event["distance_km"], event["event_date"] or ""))
+        return events[:limit] if limit else events
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build and query a spatial + date index over scraped event venues."
+    )
+    parser.add_argument(
+        "-i",
+        "--index",
+        type=str,
+        default=INDEX_PATH,
+        help=f"The index database path (default: {INDEX_PATH}).",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Index detail records from JSON output files.")
+    build_parser.add_argument(
+        "files",
+        nargs="*",
+        help=f"Detail JSON files to index (default: {OUTPUTS_GLOB}).",
+    )
+
+    radius_parser = subparsers.add_parser("radius", help="Events within a radius of a point.")
+    radius_parser.add_argument("latitude", type=float)
+    radius_parser.add_argument("longitude", type=float)
+    radius_parser.add_argument("radius_km", type=float)
+
+    bbox_parser = subparsers.add_parser("bbox", help="Events inside a bounding box.")
+    bbox_parser.add_argument("min_lat", type=float)
+    bbox_parser.add_argument("min_lon", type=float)
+    bbox_parser.add_argument("max_lat", type=float)
+    bbox_parser.add_argument("max_lon", type=float)
+
+    for subparser in (radius_parser, bbox_parser):
+        subparser.add_argument("-s", "--start-date", type=str, default=None, help="Inclusive start date (YYYY-MM-DD).")
+        subparser.add_argument("-e", "--end-date", type=str, default=None, help="Inclusive end date (YYYY-MM-DD).")
+        subparser.add_argument("-l", "--limit", type=int, default=None, help="Maximum number of results.")
+
+    args = parser.parse_args()
+    index = GeoIndex(args.index)
+
+    if args.command == "build":
+        total = 0
+        for path in args.files or sorted(glob.glob(OUTPUTS_GLOB)):
+            count = index.add_events(serialization.load(path))
+            total += count
+            print(f"Indexed {count} events from {path}")
+        print(f"\nIndexed {total} events to {args.index}")
+        index.close()
+        return
+
+    started = time.perf_counter()
+    if args.command == "radius":
+        events = index.within_radius(
+            args.latitude, args.longitude, args.radius_km, args.start_date, args.end_date, args.limit
+        )
+    else:
+        events = index.within_bbox(
+            args.min_lat, args.min_lon, args.max_lat, args.max_lon, args.start_date, args.end_date, args.limit
+        )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for event in events:
+        print(serialization.dumps(event, pretty=False))
+    print(f"{len(events)} events in {elapsed_ms:.1f} ms", file=sys.stderr)
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
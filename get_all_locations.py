@@ -1,7 +1,9 @@
 import requests
-import json
 import time
 
+import serialization
+from area_index import update_index, INDEX_PATH
+
 URL = "https://ra.co/graphql"
 HEADERS = {
     "Content-Type": "application/json",
@@ -43,7 +45,7 @@ while consecutive_failures < max_consecutive_failures:
 
     try:
         response = requests.post(URL, headers=HEADERS, json=area_payload)
-        data = response.json()
+        data = serialization.loads(response.content)
 
         if data.get("data") and data["data"].get("area"):
             area = data["data"]["area"]
@@ -89,8 +91,7 @@ if all_areas_dict:
     all_areas = list(all_areas_dict.values())
 
     # Save complete JSON
-    with open("all_locations.json", "w", encoding="utf-8") as f:
-        json.dump(all_areas, f, ensure_ascii=False, indent=2)
+    serialization.dump(all_areas, "all_locations.json")
 
     # Create a readable text file organized by country
     areas_by_country = {}
@@ -113,6 +114,9 @@ if all_areas_dict:
             for area in sorted(areas_by_country[country], key=lambda x: x["name"]):
                 f.write(f"  {area['name']:<30} | ID: {area['id']:<6} | URL: {area['urlName']}\n")
 
+    # Fold the crawl into the offline lookup index; only changed areas are re-keyed
+    changed_areas = update_index(all_areas)
+
     # Print summary
     print(f"{'='*80}")
     print(f"SUCCESS: Found {len(all_areas)} locations across {len(areas_by_country)} countries")
@@ -120,6 +124,7 @@ if all_areas_dict:
     print(f"\nSaved to:")
     print(f"  - all_locations.json (complete JSON data)")
     print(f"  - all_locations.txt (organized by country)")
+    print(f"  - {INDEX_PATH} (lookup index, {changed_areas} areas added or updated)")
     print(f"\nCountries with areas ({len(areas_by_country)}):")
     for country in sorted(areas_by_country.keys()):
         count = len(areas_by_country[country])
@@ -1,31 +1,12 @@
 import requests
-import json
-
-print("Enter city/area name (e.g., 'berlin', 'london', 'newyork')")
-city = input("City: ").strip().lower()
-
-print("\nEnter country code (e.g., 'de', 'uk', 'us', 'fr', 'es', 'jp')")
-print("Leave blank to search globally (may return first match)")
-country = input("Country code (optional): ").strip().lower() or None
-
-headers = {
-    'accept': '*/*',
-    'accept-language': 'en-US,en;q=0.5',
-    'content-type': 'application/json',
-    'origin': 'https://ra.co',
-    'referer': f'https://ra.co/events/{country or ""}{"/" if country else ""}{city}',
-    'user-agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36',
-}
+import argparse
+
+import serialization
+from area_index import resolve
 
-# Build GraphQL query variables
-variables = {"areaUrlName": city}
-if country:
-    variables["countryUrlCode"] = country
+URL = "https://ra.co/graphql"
 
-payload = {
-    "operationName": "GET_AREA_WITH_GUIDEIMAGEURL_QUERY",
-    "variables": variables,
-    "query": """query GET_AREA_WITH_GUIDEIMAGEURL_QUERY($id: ID, $areaUrlName: String, $countryUrlCode: String) {
+AREA_QUERY = """query GET_AREA_WITH_GUIDEIMAGEURL_QUERY($id: ID, $areaUrlName: String, $countryUrlCode: String) {
   area(id: $id, areaUrlName: $areaUrlName, countryUrlCode: $countryUrlCode) {
     ...areaFields
     guideImageUrl
@@ -56,25 +37,131 @@ fragment areaFields on Area {
   __typename
 }
 """
-}
 
-response = requests.post('https://ra.co/graphql', headers=headers, json=payload)
 
-try:
-    data = response.json()
+def generate_headers(city, country=None):
+    return {
+        'accept': '*/*',
+        'accept-language': 'en-US,en;q=0.5',
+        'content-type': 'application/json',
+        'origin': 'https://ra.co',
+        'referer': f'https://ra.co/events/{country or ""}{"/" if country else ""}{city}',
+        'user-agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36',
+    }
+
+
+def generate_payload(city, country=None):
+    """
+    Generate the payload for the GraphQL area request.
+
+    :param city: The area url name, e.g. 'berlin'.
+    :param country: The country url code, e.g. 'de' (optional).
+    :return: The generated payload.
+    """
+    variables = {"areaUrlName": city}
+    if country:
+        variables["countryUrlCode"] = country
+
+    return {
+        "operationName": "GET_AREA_WITH_GUIDEIMAGEURL_QUERY",
+        "variables": variables,
+        "query": AREA_QUERY,
+    }
+
+
+def fetch_raw_area(city, country=None):
+    """
+    Query ra.co for an area by url name.
+
+    :param city: The area url name, e.g. 'berlin'.
+    :param country: The country url code, e.g. 'de' (optional).
+    :return: The raw area from the API response, or None if not found.
+    """
+    response = requests.post(URL, headers=generate_headers(city, country), json=generate_payload(city, country))
+
+    try:
+        data = serialization.loads(response.content)
+    except ValueError as e:
+        print(f"Error: {e}")
+        print(f"Response: {response.text}")
+        return None
+
     if data.get("data") and data["data"].get("area"):
-        area = data["data"]["area"]
-        print(f"\n{'='*60}")
-        print(f"Area ID: {area['id']}")
-        print(f"Name: {area['name']}")
-        print(f"Country: {area['country']['name']} ({area['country']['urlCode'].upper()})")
+        return data["data"]["area"]
+
+    return None
+
+
+def fetch_area(city, country=None):
+    """
+    Query ra.co for an area, returned in the all_locations.json format.
+
+    :param city: The area url name, e.g. 'berlin'.
+    :param country: The country url code, e.g. 'de' (optional).
+    :return: The area dict, or None if not found.
+    """
+    area = fetch_raw_area(city, country)
+    if not area:
+        return None
+
+    return {
+        "id": area["id"],
+        "name": area["name"],
+        "urlName": area["urlName"],
+        "country": {
+            "name": area["country"]["name"],
+            "urlCode": area["country"]["urlCode"],
+        },
+    }
+
+
+def print_area(area):
+    print(f"\n{'='*60}")
+    print(f"Area ID: {area['id']}")
+    print(f"Name: {area['name']}")
+    print(f"Country: {area['country']['name']} ({area['country']['urlCode'].upper()})")
+    if area.get("ianaTimeZone"):
         print(f"Timezone: {area['ianaTimeZone']}")
-        print(f"{'='*60}")
+    print(f"{'='*60}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Look up an RA area ID by city name. "
+                    "Uses the offline index in locations/ and only queries ra.co on a miss. "
+                    "Prompts interactively when no city is given."
+    )
+    parser.add_argument("city", nargs="?", default=None, help="City/area name (e.g. 'berlin').")
+    parser.add_argument("-c", "--country", type=str, default=None, help="Country code (e.g. 'de').")
+    parser.add_argument("--remote", action="store_true", help="Skip the offline index and query ra.co.")
+    args = parser.parse_args()
+
+    city = args.city
+    country = args.country
+
+    if city is None:
+        print("Enter city/area name (e.g., 'berlin', 'london', 'newyork')")
+        city = input("City: ").strip()
+
+        print("\nEnter country code (e.g., 'de', 'uk', 'us', 'fr', 'es', 'jp')")
+        print("Leave blank to search globally (may return first match)")
+        country = input("Country code (optional): ").strip() or None
+
+    city = city.strip().lower()
+    country = country.strip().lower() if country else None
+
+    if args.remote:
+        area = fetch_raw_area(city, country)
+    else:
+        area = resolve(city, country)
+
+    if area:
+        print_area(area)
     else:
         print(f"\nError: Area '{city}' not found")
         if country:
             print(f"Try without country code, or check spelling")
-        print(f"\nAPI Response: {json.dumps(data, indent=2)}")
-except Exception as e:
-    print(f"\nError: {e}")
-    print(f"Response: {response.text}")
\ No newline at end of file
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
-import json, os, csv
+import os, csv
+import serialization
+from event_data import FIELDNAMES
 
 events_path = "events"
 BATCH_SIZE = 100  # Write to CSV every 100 events to avoid memory issues
@@ -9,24 +11,14 @@ for filename in os.listdir(events_path):
     if filename.endswith(".json"):
         json_file_path = os.path.join(events_path, filename)
         with open(json_file_path, "r") as events_file:
-            data = json.load(events_file)
+            data = serialization.loads(events_file.read())
             total_events = len(data)
 
             # Initialize CSV file with headers
             file_exists = os.path.isfile(csv_path)
             if not file_exists:
                 with open(csv_path, "w", newline="", encoding="utf-8") as csv_file:
-                    fieldnames = ["event_id", "area", "venue", "address", "venue_url",
-                                  "latitude", "longitude", "timezone",
-                                  "event_name", "event_date", "start_time", "end_time", "event_url",
-                                  "poster_front", "poster_back",
-                                  "promoters", "promoter_url", "artists", "artist_url",
-                                  "interested", "ticket_category", "ticket_price",
-                                  "lineup", "minimum_age", "genre", "information",
-                                  "event_admin", "website_url", "player_links",
-                                  "is_festival", "date_posted", "date_updated",
-                                  "pick_blurb", "pick_author"]
-                    writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+                    writer = csv.DictWriter(csv_file, fieldnames=FIELDNAMES)
                     writer.writeheader()
 
             batch = []
@@ -41,7 +33,7 @@ for filename in os.listdir(events_path):
                     event_path = f"temp/{event_id}.json"
                     if os.path.exists(event_path):
                         with open(event_path, "r") as event_file:
-                            event_data = json.load(event_file)
+                            event_data = serialization.loads(event_file.read())
                             batch.append({
                                 "event_id": event_data.get("event_id"),
                                 "area": event_data.get("area"),
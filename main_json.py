@@ -1,8 +1,17 @@
-import json, os
+import os
+import serialization
+from geo_index import GeoIndex
+from text_index import TextIndex
+from export_partitions import PartitionedExport
+from rollups import Rollups
+from change_feed import ChangeFeed
 
 events_path = "events"
 BATCH_SIZE = 100  # Write to JSON every 100 events to avoid memory issues
 
+# Indexes and exports kept up to date with each saved batch of newly scraped events
+indexes = [GeoIndex(), TextIndex(), PartitionedExport(), Rollups(), ChangeFeed()]
+
 for filename in os.listdir(events_path):
     if not filename.endswith(".json"):
         continue
@@ -10,16 +19,15 @@ for filename in os.listdir(events_path):
     output_path = f"outputs/{filename.replace('.json', '_full.json')}"
     json_file_path = os.path.join(events_path, filename)
 
-    with open(json_file_path, "r") as events_file:
-        data = json.load(events_file)
-        total_events = len(data)
+    data = serialization.load(json_file_path)
+    total_events = len(data)
 
     all_events = []
+    new_events = []  # Scraped since the last save, pending index updates
 
     # Load existing progress if file exists
     if os.path.isfile(output_path):
-        with open(output_path, "r", encoding="utf-8") as f:
-            all_events = json.load(f)
+        all_events = serialization.load(output_path)
         print(f"Resuming from {len(all_events)} already processed events")
         processed_ids = {e["event_id"] for e in all_events}
     else:
@@ -39,9 +47,9 @@ for filename in os.listdir(events_path):
 
             event_path = f"temp/{event_id}.json"
             if os.path.exists(event_path):
-                with open(event_path, "r") as event_file:
-                    event_data = json.load(event_file)
-                    all_events.append(event_data)
+                event_data = serialization.load(event_path)
+                all_events.append(event_data)
+                new_events.append(event_data)
             else:
                 print(f"Warning: Scraped data for {event_id} does not exist.")
         except Exception as e:
@@ -53,15 +61,19 @@ for filename in os.listdir(events_path):
         if os.path.exists(temp_path):
             os.remove(temp_path)
 
-        # Save progress every BATCH_SIZE events
-        if len(all_events) % BATCH_SIZE == 0:
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(all_events, f, ensure_ascii=False, indent=2)
+        # Save progress every BATCH_SIZE events (failed scrapes leave the count, and the batch, unchanged)
+        if new_events and len(all_events) % BATCH_SIZE == 0:
+            serialization.dump(all_events, output_path)
+            for index in indexes:
+                index.add_events(new_events)
+            new_events = []
             print(f"  → Saved progress: {len(all_events)} events")
 
     # Final save
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(all_events, f, ensure_ascii=False, indent=2)
+    serialization.dump(all_events, output_path)
+    if new_events:
+        for index in indexes:
+            index.add_events(new_events)
 
     print(f"\n{'='*60}")
     print(f"SUCCESS: Completed processing {filename}")
@@ -1,4 +1,5 @@
-import json, os
+import os
+import serialization
 
 # Process only first 100 events from a specific file
 filename = "berlin.json"  # Change this to test different cities
@@ -7,7 +8,7 @@ LIMIT = 100
 
 json_file_path = os.path.join("events", filename)
 with open(json_file_path, "r") as events_file:
-    data = json.load(events_file)
+    data = serialization.loads(events_file.read())
     data = data[:LIMIT]  # Limit for testing
     total = len(data)
 
@@ -24,7 +25,7 @@ for idx, event in enumerate(data, 1):
         event_path = f"temp/{event_id}.json"
         if os.path.exists(event_path):
             with open(event_path, "r") as event_file:
-                event_data = json.load(event_file)
+                event_data = serialization.loads(event_file.read())
                 all_events.append(event_data)
         else:
             print(f"Warning: Scraped data for {event_id} does not exist.")
@@ -38,8 +39,7 @@ for idx, event in enumerate(data, 1):
         os.remove(temp_path)
 
 # Save to JSON
-with open(output_path, "w", encoding="utf-8") as f:
-    json.dump(all_events, f, ensure_ascii=False, indent=2)
+serialization.dump(all_events, output_path)
 
 print(f"\n{'='*60}")
 print(f"SUCCESS: Saved {len(all_events)} events to {output_path}")
@@ -1,4 +1,5 @@
-import json, os, csv
+import os, csv
+import serialization
 
 # Process only first 100 events from berlin.json
 filename = "berlin.json"
@@ -7,7 +8,7 @@ all_events = []
 
 json_file_path = os.path.join("events", filename)
 with open(json_file_path, "r") as events_file:
-    data = json.load(events_file)
+    data = serialization.loads(events_file.read())
     # LIMIT TO FIRST 100 EVENTS
     data = data[:100]
     total = len(data)
@@ -23,7 +24,7 @@ with open(json_file_path, "r") as events_file:
             event_path = f"temp/{event_id}.json"
             if os.path.exists(event_path):
                 with open(event_path, "r") as event_file:
-                    event_data = json.load(event_file)
+                    event_data = serialization.loads(event_file.read())
                     all_events.append(
                         {
                             "event_id": event_data.get("event_id"),
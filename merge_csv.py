@@ -3,16 +3,28 @@ import pandas as pd
 
 folder_path = "outputs"
 
-csv_files = []
 
-for filename in os.listdir(folder_path):
-    if filename.endswith(".csv"):
-        file_path = os.path.join(folder_path, filename)
-        df = pd.read_csv(file_path)
-        csv_files.append(df)
+def merge_folder(folder_path=folder_path, output_file="all_events.csv"):
+    """
+    Concatenate every CSV file in a folder into one file.
 
-merged_csv = pd.concat(csv_files, ignore_index=True)
+    :return: The number of merged rows.
+    """
+    csv_files = []
 
-merged_csv.to_csv("all_events.csv", index=False)
+    for filename in os.listdir(folder_path):
+        if filename.endswith(".csv"):
+            file_path = os.path.join(folder_path, filename)
+            df = pd.read_csv(file_path)
+            csv_files.append(df)
 
-print("All CSV files have been merged into 'all_events.csv'.")
\ No newline at end of file
+    merged_csv = pd.concat(csv_files, ignore_index=True)
+
+    merged_csv.to_csv(output_file, index=False)
+    return len(merged_csv)
+
+
+if __name__ == "__main__":
+    merge_folder()
+
+    print("All CSV files have been merged into 'all_events.csv'.")
@@ -0,0 +1,225 @@
+import argparse
+import glob
+import gzip
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import serialization
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: appends are not locked, so don't point concurrent scrapers at one archive there
+    fcntl = None
+
+# Set RA_ARCHIVE_DIR to "" to disable archiving
+ARCHIVE_DIR = os.environ.get("RA_ARCHIVE_DIR", "archive")
+SEGMENT_BYTES = 16 * 1024 * 1024  # Start a new segment after 16 MiB, so re-transforms parallelize well
+RETRANSFORM_DIR = "outputs/retransformed"
+CODEC = "zst" if zstandard else "gz"
+
+
+def compress(data, codec=None):
+    if (codec or CODEC) == "zst":
+        return zstandard.ZstdCompressor(level=6).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data, codec):
+    if codec == "zst":
+        if zstandard is None:
+            raise RuntimeError("This archive segment is zstd-compressed; install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def segment_paths(operation, root=ARCHIVE_DIR):
+    """
+    All segments of an operation's archive, oldest first.
+    """
+    return sorted(
+        glob.glob(os.path.join(root, operation, "segment-*.jsonl.zst"))
+        + glob.glob(os.path.join(root, operation, "segment-*.jsonl.gz"))
+    )
+
+
+def index_path(segment_path):
+    return segment_path.rsplit(".jsonl.", 1)[0] + ".idx.jsonl"
+
+
+def append(operation, variables, response, root=ARCHIVE_DIR):
+    """
+    Append a raw GraphQL response to the operation's current segment.
+
+    Every record is compressed as its own gzip member / zstd frame, and its
+    offset and length go to the segment's .idx.jsonl file, so single records
+    can be read back without decompressing the whole segment. Appends take
+    an exclusive lock so concurrent scrapers can share one archive.
+
+    :param operation: The GraphQL operation name, e.g. "GET_EVENT_DETAIL".
+    :param variables: The request variables identifying the response.
+    :param response: The decoded JSON response.
+    """
+    if not root:
+        return
+
+    directory = os.path.join(root, operation)
+    os.makedirs(directory, exist_ok=True)
+
+    record = {"operation": operation, "variables": variables, "fetched_at": time.time(), "response": response}
+    frame = compress(serialization.dumps_bytes(record, pretty=False))
+
+    with open(os.path.join(directory, ".lock"), "w") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+        segments = segment_paths(operation, root)
+        # A segment holds frames of a single codec, so a codec change (e.g. zstandard
+        # installed after archiving started) starts a new segment
+        if segments and segments[-1].endswith(f".{CODEC}") and os.path.getsize(segments[-1]) < SEGMENT_BYTES:
+            segment = segments[-1]
+        else:
+            number = len(segments) + 1
+            segment = os.path.join(directory, f"segment-{number:06d}.jsonl.{CODEC}")
+
+        with open(segment, "ab") as file:
+            offset = file.tell()
+            file.write(frame)
+
+        key = variables.get("id") if isinstance(variables, dict) else None
+        with open(index_path(segment), "a", encoding="utf-8") as file:
+            file.write(serialization.dumps({"offset": offset, "length": len(frame), "key": key, "fetched_at": record["fetched_at"]}, pretty=False) + "\n")
+
+
+def safe_append(operation, variables, response, root=ARCHIVE_DIR):
+    """
+    append(), but an archive problem never fails the scrape itself.
+    """
+    try:
+        append(operation, variables, response, root)
+    except OSError as e:
+        print(f"Warning: could not archive {operation} response: {e}")
+
+
+def iter_segment(segment_path):
+    """
+    Yield every record of a segment, in append order.
+    """
+    codec = segment_path.rsplit(".", 1)[1]
+    with open(index_path(segment_path), "r", encoding="utf-8") as index_file, open(segment_path, "rb") as file:
+        for line in index_file:
+            entry = serialization.loads(line)
+            file.seek(entry["offset"])
+            yield serialization.loads(decompress(file.read(entry["length"]), codec))
+
+
+def read_at(segment_path, offset, length):
+    """
+    Read a single record by its index entry.
+    """
+    codec = segment_path.rsplit(".", 1)[1]
+    with open(segment_path, "rb") as file:
+        file.seek(offset)
+        return serialization.loads(decompress(file.read(length), codec))
+
+
+def transform_segment(segment_path):
+    """
+    Re-run normalize_event over every detail response in a segment.
+
+    :return: {event_id: (fetched_at, record)}, keeping the newest response per event.
+    """
+    # Imported here because event_data imports this module to archive its responses
+    from event_data import EventFetcher
+
+    latest = {}
+    for record in iter_segment(segment_path):
+        event = ((record["response"] or {}).get("data") or {}).get("event")
+        if not event:
+            continue
+        try:
+            normalized = EventFetcher.normalize_event(event)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Warning: could not transform event {event.get('id')}: {e}")
+            continue
+        previous = latest.get(normalized["event_id"])
+        if previous is None or record["fetched_at"] >= previous[0]:
+            latest[normalized["event_id"]] = (record["fetched_at"], normalized)
+    return latest
+
+
+def retransform(root=ARCHIVE_DIR, output_dir=RETRANSFORM_DIR, workers=None):
+    """
+    Rebuild detail outputs from archived GET_EVENT_DETAIL responses, one
+    segment per process, writing <output_dir>/<area>_full.json files.
+
+    :return: A dict of output path -> number of events.
+    """
+    from export_partitions import area_key
+
+    segments = segment_paths("GET_EVENT_DETAIL", root)
+
+    latest = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for segment, result in zip(segments, executor.map(transform_segment, segments)):
+            print(f"  {segment}: {len(result)} events")
+            for event_id, (fetched_at, record) in result.items():
+                if event_id not in latest or fetched_at >= latest[event_id][0]:
+                    latest[event_id] = (fetched_at, record)
+
+    by_area = {}
+    for fetched_at, record in latest.values():
+        by_area.setdefault(area_key(record["area"]), []).append(record)
+
+    os.makedirs(output_dir, exist_ok=True)
+    written = {}
+    for area, records in sorted(by_area.items()):
+        records.sort(key=lambda record: (record["event_date"], int(record["event_id"])))
+        path = os.path.join(output_dir, f"{area}_full.json")
+        serialization.dump(records, path)
+        written[path] = len(records)
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Inspect the raw GraphQL response archive and rebuild outputs from it offline."
+    )
+    parser.add_argument("-r", "--root", type=str, default=ARCHIVE_DIR or "archive", help="The archive directory (default: archive).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("stats", help="Show segments and record counts per operation.")
+
+    retransform_parser = subparsers.add_parser("retransform", help="Rebuild detail outputs from archived responses.")
+    retransform_parser.add_argument("-o", "--output-dir", type=str, default=RETRANSFORM_DIR, help=f"Output directory (default: {RETRANSFORM_DIR}).")
+    retransform_parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        for operation in sorted(os.listdir(args.root)) if os.path.isdir(args.root) else []:
+            segments = segment_paths(operation, args.root)
+            records = 0
+            for segment in segments:
+                with open(index_path(segment), "r", encoding="utf-8") as file:
+                    records += sum(1 for _ in file)
+            size = sum(os.path.getsize(segment) for segment in segments)
+            print(f"{operation:<20} {len(segments)} segments, {records} records, {size / 1024 / 1024:.1f} MiB")
+        return
+
+    started = time.perf_counter()
+    written = retransform(args.root, args.output_dir, args.workers)
+    for path, count in written.items():
+        print(f"Wrote {count} events to {path}")
+    print(f"\nRe-transformed {sum(written.values())} events in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
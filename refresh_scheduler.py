@@ -0,0 +1,286 @@
+import sqlite3
+import argparse
+import glob
+import hashlib
+import os
+import time
+from datetime import date, datetime
+
+import requests
+
+import serialization
+from event_data import EventFetcher, DELAY
+
+SCHEDULE_PATH = "outputs/refresh_schedule.db"
+REFRESHED_PATH = "outputs/refreshed.jsonl"
+EVENTS_GLOB = "events/*.json"
+OUTPUTS_GLOB = "outputs/*_full.json"
+BUDGET = 200  # Detail requests per run
+MAX_FAILURES = 3  # Consecutive failed requests before a run gives up
+
+HOUR = 3600
+DAY = 24 * HOUR
+FAILURE_BACKOFF = 1 * HOUR  # A failed refresh is retried after this, without counting as a check
+
+# (days until the event, refresh interval) - first match wins
+INTERVALS = [
+    (-30, 90 * DAY),  # Long past: effectively frozen
+    (-2, 14 * DAY),  # Recently past: late edits only
+    (7, 6 * HOUR),  # This week: lineups and tickets change constantly
+    (30, 1 * DAY),
+    (None, 3 * DAY),
+]
+
+
+def record_hash(record):
+    """
+    A stable content hash of a normalized event record.
+    """
+    return hashlib.sha1(serialization.dumps_bytes(record, pretty=False, sort_keys=True)).hexdigest()
+
+
+def base_interval(event_date, today=None):
+    """
+    The refresh interval for an event based on how far away it is.
+
+    :param event_date: The event date (YYYY-MM-DD, or an ISO datetime).
+    :param today: Override the current date (optional).
+    :return: The interval in seconds.
+    """
+    today = today or date.today()
+    days = (date.fromisoformat(event_date[:10]) - today).days
+
+    for limit, interval in INTERVALS:
+        if limit is None or days < limit:
+            return interval
+
+
+def refresh_interval(event_date, checks, changes, today=None):
+    """
+    The base interval scaled by the event's observed change rate: events that
+    change on most checks are refreshed up to twice as often, events that
+    never change up to half as often.
+    """
+    change_rate = (changes + 1) / (checks + 2)
+    return base_interval(event_date, today) * (0.5 + 1.5 * (1 - change_rate))
+
+
+class RefreshScheduler:
+    """
+    A persistent priority queue of event refreshes.
+
+    Each event has a next-due time derived from its refresh interval. A run
+    takes the due events that are the most intervals overdue, so upcoming
+    events (short intervals) win the request budget over historical ones.
+    """
+
+    def __init__(self, path=SCHEDULE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS schedule (
+                event_id TEXT PRIMARY KEY,
+                area TEXT,
+                event_date TEXT NOT NULL,
+                next_due REAL NOT NULL,
+                interval REAL NOT NULL,
+                last_checked REAL,
+                checks INTEGER NOT NULL DEFAULT 0,
+                changes INTEGER NOT NULL DEFAULT 0,
+                content_hash TEXT
+            );
+            CREATE INDEX IF NOT EXISTS schedule_next_due ON schedule (next_due);
+            """
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def track(self, event_id, event_date, area=None, record=None, checked_at=None):
+        """
+        Add an event to the schedule if it is not tracked yet.
+
+        Events known only from a listing are due immediately. Events with an
+        already scraped record are due one interval after checked_at.
+
+        :return: True if the event was added.
+        """
+        now = time.time()
+        interval = refresh_interval(event_date, 0, 0)
+
+        if record is None:
+            next_due, content_hash = now, None
+        else:
+            next_due, content_hash = (checked_at or now) + interval, record_hash(record)
+
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO schedule (event_id, area, event_date, next_due, interval, last_checked, content_hash)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(event_id), area, event_date[:10], next_due, interval, checked_at if record else None, content_hash),
+        )
+        return cursor.rowcount == 1
+
+    def due(self, budget=BUDGET, now=None):
+        """
+        The most valuable due refreshes, ranked by how many intervals overdue they are.
+
+        :param budget: Maximum number of events to return.
+        :return: A list of schedule rows.
+        """
+        now = now or time.time()
+        rows = self.conn.execute(
+            "SELECT *, (? - next_due) / interval AS overdue FROM schedule"
+            " WHERE next_due <= ? ORDER BY overdue DESC, event_date LIMIT ?",
+            (now, now, budget),
+        )
+        return [dict(row) for row in rows]
+
+    def record_check(self, event_id, record=None):
+        """
+        Record the result of a refresh and reschedule the event.
+
+        :param record: The freshly normalized record, or None if the event was not returned.
+        :return: True if the record is new (first fetch of a listing-only event)
+                 or its content changed since the previous check.
+        """
+        row = self.conn.execute("SELECT * FROM schedule WHERE event_id = ?", (str(event_id),)).fetchone()
+        now = time.time()
+
+        content_hash = record_hash(record) if record else row["content_hash"]
+        changed = record is not None and content_hash != row["content_hash"]
+        event_date = record["event_date"] if record else row["event_date"]
+        checks = row["checks"] + 1
+        # The first fetch of a listing-only event has nothing to differ from, so it isn't a change
+        changes = row["changes"] + (changed and row["content_hash"] is not None)
+        interval = refresh_interval(event_date, checks, changes)
+
+        self.conn.execute(
+            "UPDATE schedule SET event_date = ?, next_due = ?, interval = ?, last_checked = ?,"
+            " checks = ?, changes = ?, content_hash = ? WHERE event_id = ?",
+            (event_date, now + interval, interval, now, checks, changes, content_hash, str(event_id)),
+        )
+        self.conn.commit()
+        return changed
+
+    def record_failure(self, event_id, backoff=FAILURE_BACKOFF):
+        """
+        Retry a refresh whose request failed after a short backoff, leaving
+        the check counts and interval as they were.
+        """
+        self.conn.execute(
+            "UPDATE schedule SET next_due = MAX(next_due, ?) WHERE event_id = ?",
+            (time.time() + backoff, str(event_id)),
+        )
+        self.conn.commit()
+
+    def seed(self, events_glob=EVENTS_GLOB, outputs_glob=OUTPUTS_GLOB):
+        """
+        Track every event from scraped detail outputs and listing files.
+
+        :return: The number of newly tracked events.
+        """
+        added = 0
+
+        # Detail records first, so already scraped events start with a content hash
+        for path in sorted(glob.glob(outputs_glob)):
+            checked_at = os.path.getmtime(path)
+            for record in serialization.load(path):
+                added += self.track(record["event_id"], record["event_date"], record["area"], record, checked_at)
+
+        for path in sorted(glob.glob(events_glob)):
+            area = os.path.splitext(os.path.basename(path))[0]
+            for event in serialization.load(path):
+                added += self.track(event["event_id"], event["date"], area)
+
+        self.conn.commit()
+        return added
+
+
+def run(scheduler, budget=BUDGET, output_file=REFRESHED_PATH):
+    """
+    Refresh the most valuable due events within the request budget,
+    appending changed records to output_file as JSON lines.
+
+    Failed requests are not counted as checks: the event is retried after
+    FAILURE_BACKOFF. The run stops when the API throttles (HTTP 429) or
+    after MAX_FAILURES failures in a row, keeping the rest of the budget.
+
+    :return: (checked, changed) counts.
+    """
+    due = scheduler.due(budget)
+    print(f"{len(due)} events due (budget {budget})\n")
+
+    checked_count = 0
+    changed_count = 0
+    failures = 0
+    with open(output_file, "a", encoding="utf-8") as output:
+        for idx, row in enumerate(due, 1):
+            try:
+                event = EventFetcher(row["event_id"]).get_event_details(raise_errors=True)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                scheduler.record_failure(row["event_id"])
+                failures += 1
+                print(f"[{idx}/{len(due)}] Event {row['event_id']} ({row['event_date']}): failed ({e})")
+
+                throttled = isinstance(e, requests.exceptions.HTTPError) and e.response is not None and e.response.status_code == 429
+                if throttled or failures >= MAX_FAILURES:
+                    print("Throttled, stopping the run" if throttled else f"{failures} failed requests in a row, stopping the run")
+                    break
+                if idx < len(due):
+                    time.sleep(DELAY)
+                continue
+
+            failures = 0
+            checked_count += 1
+            record = EventFetcher.normalize_event(event) if event else None
+
+            if scheduler.record_check(row["event_id"], record):
+                changed_count += 1
+                output.write(serialization.dumps(record, pretty=False) + "\n")
+                status = "changed"
+            else:
+                status = "unchanged" if record else "not returned"
+
+            print(f"[{idx}/{len(due)}] Event {row['event_id']} ({row['event_date']}): {status}")
+            if idx < len(due):
+                time.sleep(DELAY)
+
+    return checked_count, changed_count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Refresh scraped events by priority: upcoming and frequently changing events first."
+    )
+    parser.add_argument("-s", "--schedule", type=str, default=SCHEDULE_PATH, help=f"The schedule database (default: {SCHEDULE_PATH}).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("seed", help=f"Track events from {OUTPUTS_GLOB} and {EVENTS_GLOB}.")
+
+    run_parser = subparsers.add_parser("run", help="Refresh due events within a request budget.")
+    run_parser.add_argument("-b", "--budget", type=int, default=BUDGET, help=f"Maximum detail requests (default: {BUDGET}).")
+    run_parser.add_argument("-o", "--output", type=str, default=REFRESHED_PATH, help=f"Changed records are appended here (default: {REFRESHED_PATH}).")
+
+    due_parser = subparsers.add_parser("due", help="Show what the next run would refresh.")
+    due_parser.add_argument("-b", "--budget", type=int, default=BUDGET)
+
+    args = parser.parse_args()
+    scheduler = RefreshScheduler(args.schedule)
+
+    if args.command == "seed":
+        print(f"Now tracking {scheduler.seed()} new events")
+    elif args.command == "due":
+        for row in scheduler.due(args.budget):
+            last = datetime.fromtimestamp(row["last_checked"]).strftime("%Y-%m-%d %H:%M") if row["last_checked"] else "never"
+            print(f"{row['event_id']:<10} {row['event_date']}  {row['area'] or '':<15} overdue x{row['overdue']:.2f}  last checked {last}")
+    else:
+        checked, changed = run(scheduler, args.budget, args.output)
+        print(f"\nChecked {checked} events, {changed} changed")
+
+    scheduler.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import sqlite3
+import argparse
+import glob
+import sys
+import time
+
+import serialization
+
+ROLLUPS_PATH = "outputs/rollups.db"
+OUTPUTS_GLOB = "outputs/*_full.json"
+DIMENSIONS = ["total", "area", "genre", "venue", "promoter", "weekday"]
+FEED_CONSUMER = "rollups"  # The cursor name used when following the change feed
+
+
+def split_list(value):
+    if not value or value == "N/A":
+        return []
+    return [item.strip() for item in str(value).split(",") if item.strip()]
+
+
+def contributions(record):
+    """
+    The rollup cells a normalized record counts towards.
+
+    :param record: A normalized event dict or serialization.EventRecord.
+    :return: A sorted list of (dimension, key, month) tuples.
+    """
+    month = (record.get("event_date") or "")[:7] or "unknown"
+    area = record.get("area") or "unknown"
+    keys = {
+        ("total", "all", month),
+        ("area", area, month),
+        # Venue names repeat across cities, so they are keyed with their area
+        ("venue", f"{record.get('venue') or 'unknown'} ({area})", month),
+    }
+    keys.update(("genre", genre, month) for genre in split_list(record.get("genre")))
+    keys.update(("promoter", promoter, month) for promoter in split_list(record.get("promoters")))
+
+    start_time = record.get("start_time") or ""
+    if start_time and start_time != "N/A":
+        keys.add(("weekday", start_time.split(" ")[0], month))
+
+    return sorted(keys)
+
+
+def as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def as_flag(value):
+    return 1 if value in (True, "True", "true", 1, "1") else 0
+
+
+class Rollups:
+    """
+    Materialized event counts per genre, venue, promoter, weekday and area by month.
+
+    Each event's contributions are stored alongside the aggregates, so an
+    insert, change or delete adjusts only the cells that event touches
+    instead of regrouping the corpus.
+    """
+
+    def __init__(self, path=ROLLUPS_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS rollup (
+                dimension TEXT NOT NULL,
+                key TEXT NOT NULL,
+                month TEXT NOT NULL,
+                events INTEGER NOT NULL DEFAULT 0,
+                interested INTEGER NOT NULL DEFAULT 0,
+                festivals INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, month, key)
+            );
+            CREATE INDEX IF NOT EXISTS rollup_key ON rollup (dimension, key, month);
+            CREATE TABLE IF NOT EXISTS contribution (
+                event_id TEXT PRIMARY KEY,
+                cells TEXT NOT NULL,
+                interested INTEGER NOT NULL,
+                festival INTEGER NOT NULL
+            );
+            """
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def _adjust(self, cells, sign, interested, festival):
+        self.conn.executemany(
+            "INSERT INTO rollup (dimension, key, month, events, interested, festivals) VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (dimension, month, key) DO UPDATE SET events = events + excluded.events,"
+            " interested = interested + excluded.interested, festivals = festivals + excluded.festivals",
+            [(dimension, key, month, sign, sign * interested, sign * festival) for dimension, key, month in cells],
+        )
+
+    def _retract(self, event_id):
+        row = self.conn.execute("SELECT * FROM contribution WHERE event_id = ?", (event_id,)).fetchone()
+        if row:
+            self._adjust(serialization.loads(row["cells"]), -1, row["interested"], row["festival"])
+            self.conn.execute("DELETE FROM contribution WHERE event_id = ?", (event_id,))
+
+    def add_events(self, events):
+        """
+        Insert or update normalized records in the rollups.
+
+        :param events: An iterable of event dicts or serialization.EventRecords.
+        :return: The number of events applied.
+        """
+        count = 0
+        with self.conn:
+            for event in events:
+                event_id = str(event["event_id"])
+                cells = contributions(event)
+                interested = as_int(event.get("interested"))
+                festival = as_flag(event.get("is_festival"))
+
+                self._retract(event_id)
+                self._adjust(cells, 1, interested, festival)
+                self.conn.execute(
+                    "INSERT INTO contribution VALUES (?, ?, ?, ?)",
+                    (event_id, serialization.dumps(cells, pretty=False), interested, festival),
+                )
+                count += 1
+
+            self.conn.execute("DELETE FROM rollup WHERE events <= 0")
+        return count
+
+    def remove_events(self, event_ids):
+        with self.conn:
+            for event_id in event_ids:
+                self._retract(str(event_id))
+            self.conn.execute("DELETE FROM rollup WHERE events <= 0")
+
+    def apply_changes(self, changes):
+        """
+        Apply change feed entries (see change_feed.py) in order.
+
+        :param changes: Change dicts with "op", "event_id" and "record".
+        :return: The number of changes applied.
+        """
+        for change in changes:
+            if change["op"] == "delete":
+                self.remove_events([change["event_id"]])
+            else:
+                self.add_events([change["record"]])
+        return len(changes)
+
+    def top(self, dimension, start_month=None, end_month=None, limit=20, order_by="events"):
+        """
+        The top keys of a dimension over a month range.
+
+        :param dimension: One of DIMENSIONS.
+        :param start_month: Inclusive start month, YYYY-MM (optional).
+        :param end_month: Inclusive end month, YYYY-MM (optional).
+        :param order_by: "events" or "interested". (default: "events")
+        :return: A list of {"key", "events", "interested", "festivals"} dicts.
+        """
+        sql = "SELECT key, SUM(events) AS events, SUM(interested) AS interested, SUM(festivals) AS festivals FROM rollup WHERE dimension = ?"
+        params = [dimension]
+        if start_month:
+            sql += " AND month >= ?"
+            params.append(start_month)
+        if end_month:
+            sql += " AND month <= ?"
+            params.append(end_month)
+        sql += f" GROUP BY key ORDER BY {'interested' if order_by == 'interested' else 'events'} DESC, key LIMIT ?"
+        params.append(limit)
+
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def series(self, dimension, key):
+        """
+        Monthly counts for one key, e.g. series("genre", "Techno").
+
+        :return: A list of {"month", "events", "interested", "festivals"} dicts in month order.
+        """
+        rows = self.conn.execute(
+            "SELECT month, events, interested, festivals FROM rollup WHERE dimension = ? AND key = ? ORDER BY month",
+            (dimension, key),
+        )
+        return [dict(row) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Query and rebuild precomputed event rollups by genre, venue, promoter, weekday and area."
+    )
+    parser.add_argument("-d", "--db", type=str, default=ROLLUPS_PATH, help=f"The rollups database (default: {ROLLUPS_PATH}).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Apply detail records from output files (.json, or .jsonl such as outputs/refreshed.jsonl).")
+    build_parser.add_argument("files", nargs="*", help=f"Detail record files (default: {OUTPUTS_GLOB}).")
+
+    follow_parser = subparsers.add_parser("follow", help="Apply new changes (including deletes) from the change feed.")
+    follow_parser.add_argument("--feed", type=str, default=None, help="The change feed database (default: outputs/change_feed.db).")
+
+    top_parser = subparsers.add_parser("top", help="Top keys of a dimension.")
+    top_parser.add_argument("dimension", choices=DIMENSIONS)
+    top_parser.add_argument("-s", "--start-month", type=str, default=None, help="Inclusive start month (YYYY-MM).")
+    top_parser.add_argument("-e", "--end-month", type=str, default=None, help="Inclusive end month (YYYY-MM).")
+    top_parser.add_argument("-l", "--limit", type=int, default=20)
+    top_parser.add_argument("--by-interest", action="store_true", help="Order by interested count instead of events.")
+
+    series_parser = subparsers.add_parser("series", help="Monthly counts for one key.")
+    series_parser.add_argument("dimension", choices=DIMENSIONS)
+    series_parser.add_argument("key", type=str)
+
+    args = parser.parse_args()
+    rollups = Rollups(args.db)
+
+    if args.command == "build":
+        for path in args.files or sorted(glob.glob(OUTPUTS_GLOB)):
+            print(f"Applied {rollups.add_events(serialization.load_event_records(path))} events from {path}")
+        rollups.close()
+        return
+
+    if args.command == "follow":
+        # Imported here because change_feed is only needed to follow it
+        from change_feed import ChangeFeed, FEED_PATH
+
+        feed = ChangeFeed(args.feed or FEED_PATH)
+        applied = 0
+        while True:
+            changes = feed.read(FEED_CONSUMER)
+            if not changes:
+                break
+            applied += rollups.apply_changes(changes)
+            feed.commit(FEED_CONSUMER, changes[-1]["seq"])
+        print(f"Applied {applied} changes, now at sequence number {feed.cursor(FEED_CONSUMER)}")
+        feed.close()
+        rollups.close()
+        return
+
+    started = time.perf_counter()
+    if args.command == "top":
+        rows = rollups.top(
+            args.dimension, args.start_month, args.end_month, args.limit, "interested" if args.by_interest else "events"
+        )
+    else:
+        rows = rollups.series(args.dimension, args.key)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for row in rows:
+        print(serialization.dumps(row, pretty=False))
+    print(f"{len(rows)} rows in {elapsed_ms:.1f} ms", file=sys.stderr)
+    rollups.close()
+
+
+if __name__ == "__main__":
+    main()
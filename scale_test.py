@@ -0,0 +1,177 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import serialization
+from duplicate import dedupe_folder
+from event_data import EventFetcher
+from export_partitions import PartitionedExport
+from synthetic_corpus import write_corpus, JsonArrayWriter
+
+STAGES = ["transform", "export", "dedupe", "merge"]
+SIZES = [10000, 100000]
+# A stage is flagged when its time per event grows by more than this factor between sizes
+SUPERLINEAR_FACTOR = 2.0
+
+
+def transform(raw_dir, output_dir):
+    """
+    Normalize raw events into detail files, streaming one city at a time
+    (the work raw_archive.py retransform does per segment).
+
+    :return: The number of events transformed.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    count = 0
+    for filename in sorted(os.listdir(raw_dir)):
+        city = filename.replace(".jsonl", "")
+        writer = JsonArrayWriter(os.path.join(output_dir, f"{city}_full.json"))
+        with open(os.path.join(raw_dir, filename), "rb") as file:
+            for line in file:
+                writer.write(EventFetcher.normalize_event(serialization.loads(line)))
+        count += writer.count
+        writer.close()
+    return count
+
+
+def export(details_dir, export_root):
+    os.makedirs(export_root, exist_ok=True)
+    exporter = PartitionedExport(export_root)
+    count = 0
+    for filename in sorted(os.listdir(details_dir)):
+        records = serialization.load_event_records(os.path.join(details_dir, filename))
+        exporter.add_events(records)
+        count += len(records)
+    exporter.close()
+    return count
+
+
+def merge(csv_dir, output_file):
+    # merge_csv.py needs pandas, which the scraper itself does not
+    from merge_csv import merge_folder
+    return merge_folder(csv_dir, output_file)
+
+
+def measure(function, *args):
+    """
+    Run function(*args), tracking wall time and peak Python heap usage.
+
+    :return: (result, seconds, peak bytes).
+    """
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = function(*args)
+    finally:
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run_size(count, stages, seed, workdir):
+    """
+    Generate a corpus of count events and run the selected stages on it.
+
+    :return: A dict of stage -> (events, seconds, peak bytes), or None for skipped stages.
+    """
+    root = os.path.join(workdir, f"corpus-{count}")
+    formats = [name for stage, name in [("dedupe", "listings"), ("transform", "raw"), ("merge", "csv")] if stage in stages]
+    if "export" in stages and "transform" not in stages:
+        # Export normally reads the transform stage's output
+        formats.append("details")
+
+    started = time.perf_counter()
+    write_corpus(root, count, seed, formats=formats)
+    print(f"\n{count} events (generated in {time.perf_counter() - started:.1f}s)")
+
+    jobs = {
+        "transform": (transform, os.path.join(root, "raw"), os.path.join(root, "outputs")),
+        "export": (export, os.path.join(root, "outputs"), os.path.join(root, "export")),
+        "dedupe": (dedupe_folder, os.path.join(root, "events")),
+        "merge": (merge, os.path.join(root, "csv"), os.path.join(root, "all_events.csv")),
+    }
+
+    results = {}
+    for stage in STAGES:
+        if stage not in stages:
+            continue
+        function, *args = jobs[stage]
+        try:
+            result, elapsed, peak = measure(function, *args)
+        except ImportError as e:
+            print(f"  {stage:<10} skipped ({e})")
+            results[stage] = None
+            continue
+
+        events = result[0] if isinstance(result, tuple) else result
+        results[stage] = (events, elapsed, peak)
+        print(f"  {stage:<10} {events:>9} events  {elapsed:8.2f}s  {events / elapsed:>9.0f} events/s  peak {peak / 1024 / 1024:8.1f} MiB")
+
+    shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def compare(runs):
+    """
+    Flag stages whose time per event or peak memory per event grows
+    faster than SUPERLINEAR_FACTOR between consecutive corpus sizes.
+
+    :param runs: A list of (size, results) in increasing size order.
+    :return: A list of warning strings.
+    """
+    warnings = []
+    for (small, small_results), (large, large_results) in zip(runs, runs[1:]):
+        for stage, small_result in small_results.items():
+            large_result = large_results.get(stage)
+            if not small_result or not large_result:
+                continue
+            time_growth = (large_result[1] / large_result[0]) / (small_result[1] / small_result[0])
+            memory_growth = (large_result[2] / large_result[0]) / (small_result[2] / small_result[0])
+            if time_growth > SUPERLINEAR_FACTOR:
+                warnings.append(f"{stage}: time per event grew {time_growth:.1f}x from {small} to {large} events")
+            if memory_growth > SUPERLINEAR_FACTOR:
+                warnings.append(f"{stage}: peak memory per event grew {memory_growth:.1f}x from {small} to {large} events")
+    return warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure throughput and peak memory of the offline stages on synthetic corpora "
+                    "of increasing size, flagging superlinear growth."
+    )
+    parser.add_argument("sizes", type=int, nargs="*", default=SIZES, help=f"Corpus sizes (default: {' '.join(map(str, SIZES))}).")
+    parser.add_argument("-s", "--stage", action="append", choices=STAGES, help="Only run these stages (repeatable, default: all).")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed (default: 0).")
+    parser.add_argument("-w", "--workdir", type=str, default=None, help="Where corpora are generated (default: a temporary directory).")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ra-scale-")
+    os.makedirs(workdir, exist_ok=True)
+    print(f"JSON backend: {serialization.BACKEND}, working in {workdir}")
+
+    runs = []
+    try:
+        for size in sorted(args.sizes):
+            runs.append((size, run_size(size, args.stage or STAGES, args.seed, workdir)))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    warnings = compare(runs)
+    print(f"\n{'='*60}")
+    if warnings:
+        for warning in warnings:
+            print(f"SUPERLINEAR: {warning}")
+    else:
+        print("All stages scaled linearly.")
+    print(f"{'='*60}")
+    sys.exit(1 if warnings else 0)
+
+
+if __name__ == "__main__":
+    main()
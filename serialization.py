@@ -0,0 +1,198 @@
+"""
+Shared JSON encoding and decoding for every script in this repo.
+
+Uses orjson or msgspec when one is installed and falls back to the stdlib
+json module otherwise. Output is compact by default; set RA_JSON_PRETTY=1
+(or pass --pretty to event_data.py / total_events.py) for indented files.
+Non-ASCII text is always written as UTF-8, never escaped.
+"""
+import json
+import os
+import dataclasses
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson:
+    BACKEND = "orjson"
+elif msgspec:
+    BACKEND = "msgspec"
+else:
+    BACKEND = "json"
+
+PRETTY = os.environ.get("RA_JSON_PRETTY") == "1"
+
+if msgspec:
+    _encoder = msgspec.json.Encoder()
+    _sorted_encoder = msgspec.json.Encoder(order="sorted")
+    _decoder = msgspec.json.Decoder()
+
+
+def dumps_bytes(obj, pretty=None, sort_keys=False):
+    """
+    Encode obj to UTF-8 JSON bytes.
+
+    :param pretty: Indent the output (default: the module-wide PRETTY flag).
+    :param sort_keys: Sort object keys, for stable hashes and keys.
+    """
+    pretty = PRETTY if pretty is None else pretty
+
+    if orjson:
+        option = (orjson.OPT_INDENT_2 if pretty else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, option=option)
+
+    if msgspec:
+        data = (_sorted_encoder if sort_keys else _encoder).encode(obj)
+        return msgspec.json.format(data, indent=2) if pretty else data
+
+    if pretty:
+        text = json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=sort_keys)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys)
+    return text.encode("utf-8")
+
+
+def dumps(obj, pretty=None, sort_keys=False):
+    """
+    Encode obj to a JSON string. See dumps_bytes.
+    """
+    return dumps_bytes(obj, pretty, sort_keys).decode("utf-8")
+
+
+def loads(data):
+    """
+    Decode JSON from str or bytes. Invalid JSON raises ValueError.
+    """
+    if orjson:
+        return orjson.loads(data)
+    if msgspec:
+        try:
+            return _decoder.decode(data.encode("utf-8") if isinstance(data, str) else data)
+        except msgspec.DecodeError as e:
+            # Callers catch ValueError, as raised by json and orjson
+            raise ValueError(str(e)) from e
+    return json.loads(data)
+
+
+def load(path):
+    """
+    Read and decode a JSON file.
+    """
+    with open(path, "rb") as file:
+        return loads(file.read())
+
+
+def dump(obj, path, pretty=None, atomic=False):
+    """
+    Encode obj to a JSON file.
+
+    :param pretty: Indent the output (default: the module-wide PRETTY flag).
+    :param atomic: Write to a temporary file and rename it into place, so
+                   readers never see a partially written file. (default: False)
+    """
+    target = f"{path}.tmp" if atomic else path
+    with open(target, "wb") as file:
+        file.write(dumps_bytes(obj, pretty))
+    if atomic:
+        os.replace(target, path)
+
+
+def set_pretty(pretty):
+    global PRETTY
+    PRETTY = pretty
+
+
+# Typed event records. Values whose type varies between events
+# (coordinates and counts can be "N/A") are left as Any.
+EVENT_FIELDS = {
+    "event_id": str, "area": str, "venue": str, "address": str, "venue_url": str,
+    "latitude": Any, "longitude": Any, "timezone": str,
+    "event_name": str, "event_date": str, "start_time": str, "end_time": str, "event_url": str,
+    "poster_front": str, "poster_back": str,
+    "promoters": str, "promoter_url": str, "artists": str, "artist_url": str,
+    "interested": Any, "ticket_category": str, "ticket_price": str,
+    "lineup": str, "minimum_age": Any, "genre": str, "information": Any,
+    "event_admin": str, "website_url": str, "player_links": str,
+    "is_festival": Any, "date_posted": Any, "date_updated": Any,
+    "pick_blurb": Any, "pick_author": Any,
+}
+
+
+def _record_get(record, field, default=None):
+    return getattr(record, field) if field in EVENT_FIELDS else default
+
+
+def _record_getitem(record, field):
+    if field not in EVENT_FIELDS:
+        raise KeyError(field)
+    return getattr(record, field)
+
+
+# get() and [] let code written for record dicts (rollups, partitioned exports) take EventRecords
+_record_namespace = {"get": _record_get, "__getitem__": _record_getitem}
+
+if msgspec:
+    EventRecord = msgspec.defstruct(
+        "EventRecord",
+        [(name, field_type | None if field_type is str else field_type, None) for name, field_type in EVENT_FIELDS.items()],
+        namespace=_record_namespace,
+    )
+    _records_decoder = msgspec.json.Decoder(list[EventRecord])
+    _record_decoder = msgspec.json.Decoder(EventRecord)
+else:
+    EventRecord = dataclasses.make_dataclass(
+        "EventRecord",
+        [(name, field_type, dataclasses.field(default=None)) for name, field_type in EVENT_FIELDS.items()],
+        namespace=_record_namespace,
+        slots=True,
+    )
+
+
+def _to_record(record):
+    return EventRecord(**{key: value for key, value in record.items() if key in EVENT_FIELDS})
+
+
+def decode_records(data):
+    """
+    Decode a JSON array of normalized event records into EventRecord objects
+    (msgspec Structs when msgspec is installed, dataclasses otherwise).
+    Fields are read as attributes, e.g. record.event_date, or with
+    record.get("event_date") like a record dict.
+
+    :param data: JSON text or bytes, such as the contents of outputs/*_full.json.
+    :return: A list of EventRecord.
+    """
+    if msgspec:
+        return _records_decoder.decode(data.encode("utf-8") if isinstance(data, str) else data)
+    return [_to_record(record) for record in loads(data)]
+
+
+def load_event_records(path):
+    """
+    Read a .json or .jsonl record file into EventRecord objects.
+    """
+    with open(path, "rb") as file:
+        if not path.endswith(".jsonl"):
+            return decode_records(file.read())
+        if msgspec:
+            return [_record_decoder.decode(line) for line in file if line.strip()]
+        return [_to_record(loads(line)) for line in file if line.strip()]
+
+
+def load_records(path):
+    """
+    Read normalized event records from a .json array (outputs/*_full.json)
+    or a .jsonl file (outputs/refreshed.jsonl).
+    """
+    if path.endswith(".jsonl"):
+        with open(path, "rb") as file:
+            return [loads(line) for line in file if line.strip()]
+    return load(path)
@@ -0,0 +1,311 @@
+import argparse
+import bisect
+import collections
+import csv
+import itertools
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import serialization
+from event_data import EventFetcher, FIELDNAMES
+
+# Real areas first, then "Synth City N" areas for larger corpora
+CITIES = [
+    ("Berlin", "berlin", "de", "Germany", "Europe/Berlin", 52.52, 13.40),
+    ("London", "london", "uk", "United Kingdom", "Europe/London", 51.51, -0.13),
+    ("New York City", "newyorkcity", "us", "United States of America", "America/New_York", 40.71, -74.01),
+    ("Amsterdam", "amsterdam", "nl", "Netherlands", "Europe/Amsterdam", 52.37, 4.90),
+    ("Paris", "paris", "fr", "France", "Europe/Paris", 48.86, 2.35),
+    ("Atlanta", "atlanta", "us", "United States of America", "America/New_York", 33.75, -84.39),
+    ("Tokyo", "tokyo", "jp", "Japan", "Asia/Tokyo", 35.68, 139.69),
+    ("São Paulo", "saopaulo", "br", "Brazil", "America/Sao_Paulo", -23.55, -46.63),
+    ("Melbourne", "melbourne", "au", "Australia", "Australia/Melbourne", -37.81, 144.96),
+    ("Barcelona", "barcelona", "es", "Spain", "Europe/Madrid", 41.39, 2.17),
+    ("Tbilisi", "tbilisi", "ge", "Georgia", "Asia/Tbilisi", 41.72, 44.79),
+    ("Montréal", "montreal", "ca", "Canada", "America/Toronto", 45.50, -73.57),
+]
+
+GENRES = ["Techno", "House", "Tech House", "Minimal", "Electro", "Drum & Bass", "Disco", "Ambient",
+          "Bass", "Trance", "Hard Techno", "Breaks", "Experimental", "Garage", "Jungle", "Dub"]
+TICKET_TIERS = ["Early bird", "1st release", "2nd release", "3rd release", "Final release", "Door", "Late ticket"]
+SYLLABLES = ["ka", "lo", "mi", "ra", "ven", "tor", "sol", "dé", "na", "bø", "ix", "el", "zu", "ar",
+             "an", "ke", "ri", "mo", "ul", "sa", "ton", "vi", "ja", "ße", "qu", "oz", "fen", "li"]
+WORDS = ("the night sound floor room dance music system late open doors entry ticket line up "
+         "résidence warehouse club all night long lights artists guests awareness team policy "
+         "no photos please respect each other bar cloakroom re-entry allowed until sunrise "
+         "garden terrace second floor live set b2b closing opening special extended hours "
+         "über café naïve jäger straße señor").split()
+START_DATE = datetime(2025, 1, 1)
+DAYS = 730  # Events are spread over two years
+FIRST_EVENT_ID = 2000000
+
+
+def zipf_weights(count, exponent=1.1):
+    """
+    Cumulative Zipf weights, so a few items (venues, artists) get most events.
+    """
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+class SyntheticCorpus:
+    """
+    A deterministic generator of raw GET_EVENT_DETAIL events.
+
+    The same seed and parameters always produce the same corpus. City sizes,
+    venues, promoters, artists and genres follow Zipf-like popularity, and
+    the information text has a long-tailed length distribution.
+    """
+
+    def __init__(self, seed=0, cities=len(CITIES), venues_per_city=150, artists=20000, promoters=5000):
+        self.rng = random.Random(seed)
+
+        self.cities = []
+        for idx in range(cities):
+            if idx < len(CITIES):
+                name, url_name, country_code, country, timezone, latitude, longitude = CITIES[idx]
+            else:
+                name, url_name = f"Synth City {idx + 1}", f"synthcity{idx + 1}"
+                country_code, country, timezone = "xx", "Synthland", "UTC"
+                latitude, longitude = self.rng.uniform(-60, 60), self.rng.uniform(-180, 180)
+            self.cities.append({
+                "id": str(idx + 1),
+                "name": name,
+                "urlName": url_name,
+                "country": {"name": country, "urlCode": country_code},
+                "timezone": timezone,
+                "latitude": latitude,
+                "longitude": longitude,
+                "venues": [self._venue(idx, number, latitude, longitude) for number in range(venues_per_city)],
+            })
+        self.city_weights = zipf_weights(len(self.cities), 0.9)
+        self.venue_weights = zipf_weights(venues_per_city)
+
+        self.artists = [self._name(2, 4) for _ in range(artists)]
+        self.artist_weights = zipf_weights(artists)
+        self.promoters = [f"{self._name(2, 3)} {self.rng.choice(['Records', 'Collective', 'Nights', 'Sound'])}" for _ in range(promoters)]
+        self.promoter_weights = zipf_weights(promoters)
+        self.promoter_ids = {}
+        for idx, name in enumerate(self.promoters):
+            self.promoter_ids.setdefault(name, 100000 + idx)
+        self.genre_weights = zipf_weights(len(GENRES), 1.3)
+
+    def _name(self, min_syllables, max_syllables):
+        return "".join(self.rng.choices(SYLLABLES, k=self.rng.randint(min_syllables, max_syllables))).title()
+
+    def _venue(self, city_idx, number, latitude, longitude):
+        return {
+            "id": f"{city_idx + 1}{number:05d}",
+            "name": f"{self._name(1, 3)} {self.rng.choice(['Club', 'Hall', 'Bar', 'Warehouse', 'Garden', ''])}".strip(),
+            "address": f"{self._name(2, 3)}strasse {self.rng.randint(1, 200)}",
+            "contentUrl": f"/clubs/{city_idx + 1}{number:05d}",
+            "location": {
+                "latitude": round(latitude + self.rng.gauss(0, 0.05), 5),
+                "longitude": round(longitude + self.rng.gauss(0, 0.05), 5),
+            },
+        }
+
+    def _pick(self, items, cum_weights):
+        return items[bisect.bisect(cum_weights, self.rng.random() * cum_weights[-1])]
+
+    def _information(self):
+        # Median around 500 characters, with a tail of multi-kilobyte descriptions
+        length = min(int(self.rng.lognormvariate(4.4, 1.0)), 4000)
+        return " ".join(self.rng.choices(WORDS, k=length)).capitalize() + "."
+
+    def event(self, event_id, date):
+        """
+        Build one raw event, in the shape GET_EVENT_DETAIL returns.
+        """
+        rng = self.rng
+        city = self._pick(self.cities, self.city_weights)
+        venue = self._pick(city["venues"], self.venue_weights)
+
+        artists = []
+        for _ in range(min(int(rng.expovariate(0.3)) + 1, 40)):
+            artist = self._pick(self.artists, self.artist_weights)
+            if artist not in artists:
+                artists.append(artist)
+        promoters = []
+        for _ in range(rng.choice([1, 1, 1, 2, 3])):
+            promoter = self._pick(self.promoters, self.promoter_weights)
+            if promoter not in promoters:
+                promoters.append(promoter)
+        genres = []
+        for _ in range(rng.choice([1, 2, 2, 3])):
+            genre = self._pick(GENRES, self.genre_weights)
+            if genre not in genres:
+                genres.append(genre)
+
+        start = date.replace(hour=rng.choice([18, 20, 22, 23, 23]), minute=rng.choice([0, 0, 30]))
+        end = start + timedelta(hours=rng.choice([4, 6, 8, 12, 30]))
+        posted = date - timedelta(days=rng.randint(1, 120), seconds=rng.randint(0, 86399))
+        tickets = [
+            {"title": tier, "priceRetail": 10 + 5 * idx + rng.randint(0, 5)}
+            for idx, tier in enumerate(TICKET_TIERS[:rng.randint(0, len(TICKET_TIERS))])
+        ]
+
+        return {
+            "id": str(event_id),
+            "title": f"{rng.choice(artists)} {rng.choice(['presents', 'at', 'x', 'with', '•'])} {venue['name']}",
+            "content": self._information(),
+            "minimumAge": rng.choice([None, None, 18, 21]),
+            "contentUrl": f"/events/{event_id}",
+            "date": date.strftime("%Y-%m-%dT00:00:00.000"),
+            "startTime": start.strftime("%Y-%m-%dT%H:%M:%S.000"),
+            "endTime": end.strftime("%Y-%m-%dT%H:%M:%S.000"),
+            "interestedCount": int(rng.paretovariate(1.2) * 5),
+            "lineup": "<br />".join(artists),
+            "isFestival": rng.random() < 0.02,
+            "datePosted": posted.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "dateUpdated": (posted + timedelta(days=rng.randint(0, 30))).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "images": [{"filename": f"https://images.ra.co/{rng.getrandbits(160):040x}.jpg", "type": "FLYERFRONT"}],
+            "venue": dict(
+                venue,
+                area={"id": city["id"], "name": city["name"], "urlName": city["urlName"], "country": city["country"]},
+            ),
+            "promoters": [{"name": name, "contentUrl": f"/promoters/{self.promoter_ids[name]}"} for name in promoters],
+            "artists": [{"name": name, "contentUrl": f"/dj/{name.lower()}"} for name in artists],
+            "pick": {"blurb": self._information()[:200], "author": {"name": self._name(2, 3)}} if rng.random() < 0.01 else None,
+            "promotionalLinks": [{"title": "Instagram", "url": f"https://instagram.com/{promoters[0].lower().replace(' ', '')}"}],
+            "admin": {"username": promoters[0]},
+            "tickets": tickets,
+            "playerLinks": [],
+            "genres": [{"name": genre} for genre in genres],
+            "area": {"ianaTimeZone": city["timezone"]},
+        }
+
+    def events(self, count):
+        """
+        Yield count raw events with increasing dates and event ids (with gaps).
+        """
+        event_id = FIRST_EVENT_ID
+        for idx in range(count):
+            event_id += 1 + int(self.rng.expovariate(0.5))
+            date = START_DATE + timedelta(days=idx * DAYS // count)
+            yield self.event(event_id, date)
+
+
+class JsonArrayWriter:
+    """
+    Writes a JSON array one element at a time, so corpora larger than
+    memory can be produced.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.file.write(b"[")
+        self.count = 0
+
+    def write(self, item):
+        self.file.write((b"," if self.count else b"") + serialization.dumps_bytes(item, pretty=False))
+        self.count += 1
+
+    def close(self):
+        self.file.write(b"]")
+        self.file.close()
+
+
+def write_corpus(root, count, seed=0, cities=len(CITIES), duplicate_rate=0.05, formats=("listings", "raw", "details", "csv")):
+    """
+    Generate a corpus laid out like the repo's own data:
+
+    - <root>/events/<city>.json: listing files, with duplicate entries as left
+      behind by overlapping date windows (for duplicate.py)
+    - <root>/raw/<city>.jsonl: raw GET_EVENT_DETAIL events (for transform tests)
+    - <root>/outputs/<city>_full.json: normalized detail records
+    - <root>/csv/<city>.csv: detail records as CSV (for merge_csv.py)
+
+    :param count: The number of distinct events.
+    :param duplicate_rate: The share of listing entries repeated in a later window. (default: 0.05)
+    :param formats: Which of the layouts above to write.
+    :return: A dict of format -> number of records written.
+    """
+    corpus = SyntheticCorpus(seed, cities)
+    # Duplicates draw from their own generator, so the events don't depend on which formats are written
+    duplicate_rng = random.Random(f"{seed}-duplicates")
+    directories = {"listings": "events", "raw": "raw", "details": "outputs", "csv": "csv"}
+    for name in formats:
+        os.makedirs(os.path.join(root, directories[name]), exist_ok=True)
+
+    listings, raws, details, csvs = {}, {}, {}, {}
+    recent = {}  # Recent listing entries per city, to repeat as cross-window duplicates
+    written = dict.fromkeys(formats, 0)
+
+    try:
+        for raw in corpus.events(count):
+            city = raw["venue"]["area"]["urlName"]
+
+            if "listings" in formats:
+                if city not in listings:
+                    listings[city] = JsonArrayWriter(os.path.join(root, "events", f"{city}.json"))
+                    recent[city] = collections.deque(maxlen=50)
+                writer = listings[city]
+                entry = {"id": writer.count, "date": raw["date"], "event_id": int(raw["id"])}
+                writer.write(entry)
+                recent[city].append(entry)
+                if duplicate_rng.random() < duplicate_rate:
+                    writer.write(dict(duplicate_rng.choice(recent[city]), id=writer.count))
+                written["listings"] += 1
+
+            if "raw" in formats:
+                if city not in raws:
+                    raws[city] = open(os.path.join(root, "raw", f"{city}.jsonl"), "wb")
+                raws[city].write(serialization.dumps_bytes(raw, pretty=False) + b"\n")
+                written["raw"] += 1
+
+            if "details" in formats or "csv" in formats:
+                record = EventFetcher.normalize_event(raw)
+
+                if "details" in formats:
+                    if city not in details:
+                        details[city] = JsonArrayWriter(os.path.join(root, "outputs", f"{city}_full.json"))
+                    details[city].write(record)
+                    written["details"] += 1
+
+                if "csv" in formats:
+                    if city not in csvs:
+                        file = open(os.path.join(root, "csv", f"{city}.csv"), "w", newline="", encoding="utf-8")
+                        csvs[city] = (file, csv.DictWriter(file, fieldnames=FIELDNAMES))
+                        csvs[city][1].writeheader()
+                    csvs[city][1].writerow(record)
+                    written["csv"] += 1
+    finally:
+        for writer in list(listings.values()) + list(details.values()):
+            writer.close()
+        for file in list(raws.values()) + [file for file, _ in csvs.values()]:
+            file.close()
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a deterministic synthetic event corpus for scale testing."
+    )
+    parser.add_argument("count", type=int, help="Number of distinct events, e.g. 100000.")
+    parser.add_argument("-o", "--output", type=str, default="temp/synthetic", help="Output directory (default: temp/synthetic).")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Random seed (default: 0).")
+    parser.add_argument("-c", "--cities", type=int, default=len(CITIES), help=f"Number of cities (default: {len(CITIES)}).")
+    parser.add_argument("-d", "--duplicate-rate", type=float, default=0.05, help="Share of listing entries duplicated (default: 0.05).")
+    parser.add_argument(
+        "-f", "--format", action="append", choices=["listings", "raw", "details", "csv"],
+        help="Only write these formats (repeatable, default: all).",
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    written = write_corpus(
+        args.output, args.count, args.seed, args.cities, args.duplicate_rate,
+        args.format or ("listings", "raw", "details", "csv"),
+    )
+    elapsed = time.perf_counter() - started
+
+    for name, count in written.items():
+        print(f"{name:<10} {count} events")
+    print(f"\nGenerated {args.count} events in {elapsed:.1f}s ({args.count / elapsed:.0f} events/s) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+import sqlite3
+import argparse
+import glob
+import re
+import sys
+import time
+import unicodedata
+
+import serialization
+
+INDEX_PATH = "outputs/text_index.db"
+OUTPUTS_GLOB = "outputs/*_full.json"
+FIELDS = ["event_name", "artists", "lineup", "information"]
+ESTIMATE_CAP = 2000  # Rows counted at most when choosing where a search starts
+FETCH_SIZE = 200  # Candidates checked per round before stopping at the limit
+
+
+def tokenize(text):
+    """
+    Split text into accent-folded, case-folded word tokens.
+
+    :param text: Any string (None and "N/A" produce no tokens).
+    :return: A list of tokens in order, so list positions are token positions.
+    """
+    if not text or text == "N/A":
+        return []
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"\w+", text.casefold())
+
+
+def parse_query(query):
+    """
+    Parse a query into OR-ed clauses of AND-ed items.
+
+    Terms are AND-ed by default, "double quoted" text is a phrase and the
+    uppercase keyword OR separates alternatives, e.g.
+    'ben klock OR "dj stingray" techno' -> [[ben], [klock]] OR [[dj, stingray], [techno]].
+
+    :param query: The query string.
+    :return: A list of clauses; each clause is a list of token lists.
+    """
+    clauses = [[]]
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        if word == "OR":
+            clauses.append([])
+            continue
+        tokens = tokenize(phrase or word)
+        if phrase:
+            if tokens:
+                clauses[-1].append(tokens)
+        else:
+            clauses[-1].extend([token] for token in tokens)
+    return [clause for clause in clauses if clause]
+
+
+class TextIndex:
+    """
+    An on-disk inverted index with positional postings over the text fields
+    of normalized detail records (event_name, artists, lineup, information).
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                event_id TEXT PRIMARY KEY,
+                area TEXT,
+                event_date TEXT,
+                event_name TEXT,
+                artists TEXT,
+                event_url TEXT
+            );
+            DROP INDEX IF EXISTS docs_area_date;
+            CREATE INDEX IF NOT EXISTS docs_area_date_nocase ON docs (area COLLATE NOCASE, event_date);
+            CREATE INDEX IF NOT EXISTS docs_date ON docs (event_date);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                field TEXT NOT NULL,
+                positions TEXT NOT NULL,
+                PRIMARY KEY (term, event_id, field)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_event ON postings (event_id);
+            """
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def add_events(self, events):
+        """
+        Index (or re-index) normalized detail records.
+
+        :param events: An iterable of event dicts.
+        :return: The number of events indexed.
+        """
+        count = 0
+        with self.conn:
+            for event in events:
+                event_id = str(event["event_id"])
+                self.conn.execute("DELETE FROM postings WHERE event_id = ?", (event_id,))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        event_id,
+                        event.get("area"),
+                        event.get("event_date"),
+                        event.get("event_name"),
+                        event.get("artists"),
+                        event.get("event_url"),
+                    ),
+                )
+
+                rows = []
+                for field in FIELDS:
+                    positions = {}
+                    for position, token in enumerate(tokenize(event.get(field))):
+                        positions.setdefault(token, []).append(position)
+                    rows.extend(
+                        (token, event_id, field, ",".join(map(str, token_positions)))
+                        for token, token_positions in positions.items()
+                    )
+                self.conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)", rows)
+                count += 1
+
+        return count
+
+    def remove_events(self, event_ids):
+        with self.conn:
+            for event_id in event_ids:
+                self.conn.execute("DELETE FROM postings WHERE event_id = ?", (str(event_id),))
+                self.conn.execute("DELETE FROM docs WHERE event_id = ?", (str(event_id),))
+
+    def _field_filter(self, fields, alias="p"):
+        if set(fields) >= set(FIELDS):
+            return "", []
+        return f" AND {alias}.field IN ({','.join('?' * len(fields))})", list(fields)
+
+    def _estimate(self, sql, params):
+        """
+        :return: The number of rows sql returns, counting at most ESTIMATE_CAP.
+        """
+        return self.conn.execute(f"SELECT COUNT(*) FROM ({sql} LIMIT {ESTIMATE_CAP})", params).fetchone()[0]
+
+    def _postings(self, term, fields, event_ids):
+        """
+        :return: {event_id: {field: [positions]}} for a single term, limited to event_ids.
+        """
+        field_sql, field_params = self._field_filter(fields)
+        rows = self.conn.execute(
+            "SELECT p.event_id, p.field, p.positions FROM postings p"
+            f" WHERE p.term = ? AND p.event_id IN (SELECT value FROM json_each(?)){field_sql}",
+            [term, serialization.dumps(sorted(event_ids), pretty=False), *field_params],
+        )
+
+        postings = {}
+        for row in rows:
+            postings.setdefault(row["event_id"], {})[row["field"]] = [
+                int(position) for position in row["positions"].split(",")
+            ]
+        return postings
+
+    def _match_phrase(self, tokens, fields, event_ids):
+        """
+        :return: The subset of event_ids where the tokens appear consecutively in one field.
+        """
+        # {event_id: {field: possible phrase start positions}}, narrowed token by token
+        starts = self._postings(tokens[0], fields, event_ids)
+        for offset, token in enumerate(tokens[1:], 1):
+            postings = self._postings(token, fields, starts)
+            narrowed = {}
+            for event_id, token_fields in postings.items():
+                for field, positions in token_fields.items():
+                    field_starts = set(starts[event_id].get(field, ())) & {position - offset for position in positions}
+                    if field_starts:
+                        narrowed.setdefault(event_id, {})[field] = field_starts
+            starts = narrowed
+            if not starts:
+                break
+        return set(starts)
+
+    def _match_clause(self, clause, fields, filters, filter_params, limit):
+        """
+        The newest events that contain every item of an AND-ed clause.
+
+        Term membership is checked in SQL. The query starts from whichever is
+        smaller: the rarest term's postings, or the docs within the area and
+        date filters (walked through docs_area_date_nocase or docs_date).
+        Phrase positions are only read for the candidates in each fetched
+        round, and fetching stops once limit events have matched.
+
+        :return: A list of at most limit event ids, newest first.
+        """
+        field_sql, field_params = self._field_filter(fields)
+        counts = {
+            term: self._estimate(f"SELECT 1 FROM postings p WHERE p.term = ?{field_sql}", [term, *field_params])
+            for tokens in clause
+            for term in tokens
+        }
+        if not all(counts.values()):
+            return []
+
+        rarest = min(counts, key=counts.get)
+        docs_count = self._estimate(f"SELECT 1 FROM docs d WHERE 1{filters}", filter_params)
+
+        exists = f"EXISTS (SELECT 1 FROM postings p WHERE p.term = ? AND p.event_id = d.event_id{field_sql})"
+        if docs_count <= counts[rarest]:
+            terms = list(counts)
+            sql = "SELECT d.event_id FROM docs d WHERE 1"
+            params = []
+        else:
+            terms = [term for term in counts if term != rarest]
+            sql = (
+                f"SELECT d.event_id FROM (SELECT DISTINCT p.event_id FROM postings p WHERE p.term = ?{field_sql}) AS m"
+                " CROSS JOIN docs d ON d.event_id = m.event_id WHERE 1"
+            )
+            params = [rarest, *field_params]
+        for term in terms:
+            sql += f" AND {exists}"
+            params += [term, *field_params]
+        sql += f"{filters} ORDER BY d.event_date DESC, d.event_id"
+        params += filter_params
+
+        phrases = [tokens for tokens in clause if len(tokens) > 1]
+        cursor = self.conn.execute(sql, params)
+        matches = []
+        while len(matches) < limit:
+            event_ids = [row["event_id"] for row in cursor.fetchmany(FETCH_SIZE)]
+            if not event_ids:
+                break
+            candidates = set(event_ids)
+            for tokens in phrases:
+                candidates = self._match_phrase(tokens, fields, candidates)
+                if not candidates:
+                    break
+            matches.extend(event_id for event_id in event_ids if event_id in candidates)
+        return matches[:limit]
+
+    def search(self, query, area=None, start_date=None, end_date=None, fields=None, limit=50):
+        """
+        Search the index.
+
+        :param query: The query string (see parse_query for the syntax).
+        :param area: Only return events in this area, e.g. "Berlin" (optional).
+        :param start_date: Inclusive start date, YYYY-MM-DD (optional).
+        :param end_date: Inclusive end date, YYYY-MM-DD (optional).
+        :param fields: Restrict matching to these fields (default: all indexed fields).
+        :param limit: Maximum number of results, newest first. (default: 50)
+        :return: A list of matching docs.
+        """
+        fields = fields or FIELDS
+
+        filters = ""
+        filter_params = []
+        if area:
+            filters += " AND d.area = ? COLLATE NOCASE"
+            filter_params.append(area)
+        if start_date:
+            filters += " AND d.event_date >= ?"
+            filter_params.append(start_date)
+        if end_date:
+            filters += " AND d.event_date <= ?"
+            filter_params.append(end_date)
+
+        # The newest limit matches of the query are among the newest limit matches of its clauses
+        matches = set()
+        for clause in parse_query(query):
+            matches.update(self._match_clause(clause, fields, filters, filter_params, limit))
+
+        if not matches:
+            return []
+
+        rows = self.conn.execute(
+            "SELECT * FROM docs WHERE event_id IN (SELECT value FROM json_each(?))"
+            " ORDER BY event_date DESC, event_id LIMIT ?",
+            [serialization.dumps(sorted(matches), pretty=False), limit],
+        )
+        return [dict(row) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build and query a full-text index over lineups, artists, titles and event information."
+    )
+    parser.add_argument(
+        "-i",
+        "--index",
+        type=str,
+        default=INDEX_PATH,
+        help=f"The index database path (default: {INDEX_PATH}).",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Index detail records from JSON output files.")
+    build_parser.add_argument("files", nargs="*", help=f"Detail JSON files to index (default: {OUTPUTS_GLOB}).")
+
+    search_parser = subparsers.add_parser("search", help="Search the index.")
+    search_parser.add_argument("query", help='Query, e.g. \'"ben klock" OR dvs1 techno\'.')
+    search_parser.add_argument("-a", "--area", type=str, default=None, help="Area name, e.g. 'Berlin'.")
+    search_parser.add_argument("-s", "--start-date", type=str, default=None, help="Inclusive start date (YYYY-MM-DD).")
+    search_parser.add_argument("-e", "--end-date", type=str, default=None, help="Inclusive end date (YYYY-MM-DD).")
+    search_parser.add_argument("-f", "--field", action="append", choices=FIELDS, help="Restrict to a field (repeatable).")
+    search_parser.add_argument("-l", "--limit", type=int, default=50, help="Maximum number of results (default: 50).")
+
+    args = parser.parse_args()
+    index = TextIndex(args.index)
+
+    if args.command == "build":
+        total = 0
+        for path in args.files or sorted(glob.glob(OUTPUTS_GLOB)):
+            count = index.add_events(serialization.load(path))
+            total += count
+            print(f"Indexed {count} events from {path}")
+        print(f"\nIndexed {total} events to {args.index}")
+        index.close()
+        return
+
+    started = time.perf_counter()
+    results = index.search(args.query, args.area, args.start_date, args.end_date, args.field, args.limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for doc in results:
+        print(serialization.dumps(doc, pretty=False))
+    print(f"{len(results)} events in {elapsed_ms:.1f} ms", file=sys.stderr)
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
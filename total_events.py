@@ -1,10 +1,14 @@
 import requests
-import json
 import time
 import sys
 import argparse
+import os
+import shutil
 from datetime import datetime, timedelta
 
+import raw_archive
+import serialization
+
 URL = "https://ra.co/graphql"
 HEADERS = {
     "Content-Type": "application/json",
@@ -13,9 +17,79 @@ HEADERS = {
 }
 
 QUERY_TEMPLATE_PATH = "payloads/all_events.json"
+CHECKPOINT_DIR = "temp/checkpoints"
 DELAY = 2
 
 
+def write_json_atomic(path, data):
+    """
+    Write JSON so that a crash leaves either the old file or the complete new one.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(serialization.dumps_bytes(data, pretty=False))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+class WindowCheckpoint:
+    """
+    Durable checkpoints for one listing window (area + date range).
+
+    Every fetched page is written to its own file as soon as it arrives, and
+    a done.json marker is written once the window is complete. A rerun skips
+    complete windows and resumes incomplete ones after the last saved page.
+    """
+
+    def __init__(self, root, areas, start, end):
+        self.params = {"areas": areas, "start": start, "end": end}
+        self.dir = os.path.join(root, f"{areas}_{start}_{end}")
+        self.done_path = os.path.join(self.dir, "done.json")
+
+    def is_complete(self):
+        return os.path.isfile(self.done_path)
+
+    def page_paths(self):
+        if not os.path.isdir(self.dir):
+            return []
+        return sorted(
+            os.path.join(self.dir, name)
+            for name in os.listdir(self.dir)
+            if name.startswith("page-") and name.endswith(".json")
+        )
+
+    def load_pages(self):
+        """
+        :return: A list of saved page dicts ({"page", "total_results", "events"}), in page order.
+        """
+        pages = []
+        for path in self.page_paths():
+            pages.append(serialization.load(path))
+        return pages
+
+    def save_page(self, page_number, events, total_results):
+        os.makedirs(self.dir, exist_ok=True)
+        write_json_atomic(
+            os.path.join(self.dir, f"page-{page_number:04d}.json"),
+            {"params": self.params, "page": page_number, "total_results": total_results, "events": events},
+        )
+
+    def mark_complete(self, total_results, count):
+        os.makedirs(self.dir, exist_ok=True)
+        write_json_atomic(self.done_path, dict(self.params, total_results=total_results, count=count))
+
+    def iter_events(self):
+        """
+        Yield the window's events page by page, without loading the whole window.
+        """
+        for path in self.page_paths():
+            yield from serialization.load(path)["events"]
+
+    def clear(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
 class EventFetcher:
     """
     A class to fetch and print event details from RA.co
@@ -26,6 +100,7 @@ class EventFetcher:
         self.areas = areas
         self.listing_date_gte = listing_date_gte
         self.listing_date_lte = listing_date_lte
+        self.total_results = None
         self.payload = self.generate_payload(areas, listing_date_gte, listing_date_lte)
 
     @staticmethod
@@ -38,8 +113,7 @@ class EventFetcher:
         :param listing_date_lte: The end date for event listings (inclusive, optional).
         :return: The generated payload.
         """
-        with open(QUERY_TEMPLATE_PATH, "r") as file:
-            payload = json.load(file)
+        payload = serialization.load(QUERY_TEMPLATE_PATH)
 
         payload["variables"]["filters"]["areas"]["eq"] = areas
         payload["variables"]["filters"]["listingDate"]["gte"] = listing_date_gte
@@ -55,50 +129,73 @@ class EventFetcher:
         Fetch events for the given page number.
 
         :param page_number: The page number for event listings.
-        :return: A list of events and total results count.
+        :return: A list of events and total results count (None if the request failed).
         """
         self.payload["variables"]["page"] = page_number
         response = requests.post(URL, headers=HEADERS, json=self.payload)
 
         try:
             response.raise_for_status()
-            data = response.json()
+            data = serialization.loads(response.content)
         except (requests.exceptions.RequestException, ValueError) as e:
             print(f"Error: {response.status_code} - {e}")
-            return [], 0
+            return [], None
+
+        raw_archive.safe_append(
+            "GET_EVENT_LISTINGS",
+            {"filters": self.payload["variables"]["filters"], "page": page_number},
+            data,
+        )
 
         if "data" not in data:
             print(f"Error: {data}")
-            return [], 0
+            return [], None
 
         total_results = data["data"]["eventListings"]["totalResults"]
         events = data["data"]["eventListings"]["data"]
 
         return events, total_results
 
-    def fetch_all_events(self):
+    def fetch_all_events(self, checkpoint=None):
         """
         Fetch all events for the configured date range.
         Uses pagination to get all pages.
 
+        :param checkpoint: A WindowCheckpoint to save each page to and resume from (optional).
         :return: A list of all events.
         """
         all_events = []
         page_number = 1
         total_results = None
+        exhausted = False
 
-        while True:
+        if checkpoint:
+            for page in checkpoint.load_pages():
+                all_events.extend(page["events"])
+                page_number = page["page"] + 1
+                total_results = page["total_results"]
+            if total_results is not None:
+                print(f"  Resuming from page {page_number} ({len(all_events)}/{total_results} events checkpointed)")
+
+        while total_results is None or len(all_events) < total_results:
             events, total_count = self.get_events(page_number)
 
+            if total_count is None:
+                # Request failed: stop here and leave the window incomplete
+                break
+
             if total_results is None:
                 total_results = total_count
                 total_pages = (total_results // 100) + 1
                 print(f"  Total results: {total_results}, Pages: {total_pages}")
 
             if not events:
+                exhausted = True
                 break
 
             all_events.extend(events)
+            if checkpoint:
+                checkpoint.save_page(page_number, events, total_results)
             print(f"  Fetched page {page_number}, got {len(events)} events (total so far: {len(all_events)})")
 
             # Check if we've fetched all pages
@@ -108,30 +205,44 @@ class EventFetcher:
             page_number += 1
             time.sleep(DELAY)
 
+        self.total_results = total_results
+        if checkpoint and total_results is not None and (exhausted or len(all_events) >= total_results):
+            checkpoint.mark_complete(total_results, len(all_events))
+
         return all_events
 
     def save_events_to_json(self, events, output_file="events.json"):
         """
         Save events to a JSON file.
 
-        :param events: A list of events.
+        Entries are written one at a time, so events can be any iterable
+        (e.g. streamed from checkpoints) without holding them all in memory.
+
+        :param events: An iterable of events.
         :param output_file: The output file path. (default: "events.json")
+        :return: The number of events saved.
         """
-        data = []
-        for idx, event in enumerate(events):
-            event_data = event["event"]
-            data.append(
-                {
+        count = 0
+        with open(output_file, "w", encoding="utf-8") as file:
+            file.write("[")
+            for idx, event in enumerate(events):
+                event_data = event["event"]
+                entry = {
                     "id": idx,
                     "date": event_data["date"],
                     "event_id": int(event_data["contentUrl"].split("/")[-1]),
                 }
-            )
+                if serialization.PRETTY:
+                    # Same layout as an indented dump of the whole list
+                    entry_json = serialization.dumps(entry, pretty=True).replace("\n", "\n  ")
+                    file.write(f"{',' if idx else ''}\n  {entry_json}")
+                else:
+                    file.write(f"{',' if idx else ''}{serialization.dumps(entry, pretty=False)}")
+                count += 1
+            file.write("\n]" if count and serialization.PRETTY else "]")
 
-        with open(output_file, "w", encoding="utf-8") as file:
-            json.dump(data, file, ensure_ascii=False, indent=4)
-
-        print(f"\nSaved {len(data)} events to {output_file}")
+        print(f"\nSaved {count} events to {output_file}")
+        return count
 
 
 def generate_date_chunks(start_date, end_date, chunk_months=1):
@@ -192,8 +303,33 @@ def main():
         help="Size of date chunks in months (default: 3). "
              "Smaller chunks = more requests but safer for large date ranges.",
     )
+    parser.add_argument(
+        "--checkpoint-dir",
+        type=str,
+        default=CHECKPOINT_DIR,
+        help=f"Where per-page checkpoints are kept (default: {CHECKPOINT_DIR}). "
+             "A rerun skips finished chunks and resumes from the last saved page.",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Discard existing checkpoints for this run and fetch everything again.",
+    )
+    parser.add_argument(
+        "--keep-checkpoints",
+        action="store_true",
+        help="Keep checkpoints after the output has been written.",
+    )
+    parser.add_argument(
+        "--pretty",
+        action="store_true",
+        help="Indent the output file (default: compact, or RA_JSON_PRETTY=1).",
+    )
     args = parser.parse_args()
 
+    if args.pretty:
+        serialization.set_pretty(True)
+
     # Parse dates
     start_date = datetime.strptime(args.start_date, "%Y-%m-%d")
     end_date = datetime.strptime(args.end_date, "%Y-%m-%d") if args.end_date else datetime.now()
@@ -206,12 +342,22 @@ def main():
     chunks = generate_date_chunks(start_date, end_date, args.chunk_months)
     print(f"Split into {len(chunks)} chunks to avoid API limits:\n")
 
-    all_events = []
+    checkpoints = []
+    incomplete = []
 
     for i, (chunk_start, chunk_end) in enumerate(chunks, 1):
         start_str = chunk_start.strftime("%Y-%m-%d")
         end_str = chunk_end.strftime("%Y-%m-%d")
 
+        checkpoint = WindowCheckpoint(args.checkpoint_dir, args.areas, start_str, end_str)
+        if args.restart:
+            checkpoint.clear()
+        checkpoints.append(checkpoint)
+
+        if checkpoint.is_complete():
+            print(f"Chunk {i}/{len(chunks)}: {start_str} to {end_str} already checkpointed, skipping\n")
+            continue
+
         print(f"Chunk {i}/{len(chunks)}: {start_str} to {end_str}")
 
         # Create fetcher for this chunk
@@ -219,23 +365,39 @@ def main():
         listing_date_lte = f"{end_str}T23:59:59.999Z"
 
         event_fetcher = EventFetcher(args.areas, listing_date_gte, listing_date_lte)
-        events = event_fetcher.fetch_all_events()
+        events = event_fetcher.fetch_all_events(checkpoint)
 
-        all_events.extend(events)
-        print(f"Chunk complete. Running total: {len(all_events)} events\n")
+        if checkpoint.is_complete():
+            print(f"Chunk complete. {len(events)} events checkpointed\n")
+        else:
+            incomplete.append(f"{start_str} to {end_str}")
+            print(f"Chunk incomplete ({len(events)} events checkpointed)\n")
 
         # Small delay between chunks
         if i < len(chunks):
             time.sleep(DELAY)
 
+    if incomplete:
+        print(f"\n{'='*60}")
+        print(f"INCOMPLETE: {len(incomplete)} chunks did not finish: {', '.join(incomplete)}")
+        print(f"Rerun the same command to resume from {args.checkpoint_dir}")
+        print(f"{'='*60}\n")
+        sys.exit(1)
+
     # Save all events
     print(f"\n{'='*60}")
-    print(f"COMPLETE: Fetched {len(all_events)} total events")
+    print(f"COMPLETE: All {len(chunks)} chunks fetched, assembling output from checkpoints")
     print(f"{'='*60}\n")
 
-    # Create a dummy fetcher just to use the save method
+    # Create a dummy fetcher just to use the save method, streaming events from the checkpoints
     event_fetcher = EventFetcher(args.areas, "")
-    event_fetcher.save_events_to_json(all_events, args.output)
+    event_fetcher.save_events_to_json(
+        (event for checkpoint in checkpoints for event in checkpoint.iter_events()), args.output
+    )
+
+    if not args.keep_checkpoints:
+        for checkpoint in checkpoints:
+            checkpoint.clear()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,406 @@
+import sqlite3
+import argparse
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+
+import event_data
+import serialization
+import total_events
+
+QUEUE_PATH = "outputs/work_queue.db"
+SHARDS_DIR = "outputs/shards"
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 5
+GLOBAL_RATE = 2.0  # Requests per second shared by every worker on the queue
+BATCH_SIZE = 50  # Event IDs per work unit
+
+
+class WorkQueue:
+    """
+    A lease-based work queue in a SQLite file shared between workers.
+
+    Work units are either listing windows ({"area", "start", "end"}) or
+    batches of event IDs ({"event_ids"}). A worker claims a unit under a
+    time-limited lease and renews it while working; if the worker crashes
+    the lease expires and the unit is claimed again by someone else.
+    """
+
+    def __init__(self, path=QUEUE_PATH, lease_seconds=LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        # Autocommit mode, so claims can take an explicit write lock with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS units (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                output TEXT,
+                UNIQUE (kind, params)
+            );
+            CREATE INDEX IF NOT EXISTS units_status ON units (status, lease_expires);
+            CREATE TABLE IF NOT EXISTS rate (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                next_slot REAL NOT NULL
+            );
+            INSERT OR IGNORE INTO rate VALUES (1, 0);
+            """
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def _write(self, sql, params=()):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self.conn.execute(sql, params)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            return cursor.rowcount
+
+    def enqueue(self, kind, params_list):
+        """
+        Add work units, ignoring ones already queued.
+
+        :param kind: "listings" or "events".
+        :param params_list: An iterable of parameter dicts.
+        :return: The number of new units.
+        """
+        added = 0
+        for params in params_list:
+            added += self._write(
+                "INSERT OR IGNORE INTO units (kind, params) VALUES (?, ?)",
+                (kind, serialization.dumps(params, pretty=False, sort_keys=True)),
+            )
+        return added
+
+    def claim(self, worker):
+        """
+        Claim the oldest pending unit, or one whose lease has expired.
+
+        :param worker: The claiming worker's id.
+        :return: The unit row as a dict, or None if nothing is claimable.
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Units whose worker died on the last allowed attempt are not retried forever
+                self.conn.execute(
+                    "UPDATE units SET status = 'failed', error = COALESCE(error, 'lease expired')"
+                    " WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, MAX_ATTEMPTS),
+                )
+                row = self.conn.execute(
+                    "SELECT * FROM units WHERE status = 'pending'"
+                    " OR (status = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row:
+                    self.conn.execute(
+                        "UPDATE units SET status = 'leased', worker = ?, lease_expires = ?,"
+                        " attempts = attempts + 1 WHERE id = ?",
+                        (worker, now + self.lease_seconds, row["id"]),
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        if not row:
+            return None
+        unit = dict(row)
+        unit["params"] = serialization.loads(unit["params"])
+        return unit
+
+    def renew(self, unit_id, worker):
+        """
+        Extend a lease. Returns False if the lease was lost to another worker.
+        """
+        return self._write(
+            "UPDATE units SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            (time.time() + self.lease_seconds, unit_id, worker),
+        ) == 1
+
+    def complete(self, unit_id, worker, output):
+        return self._write(
+            "UPDATE units SET status = 'done', output = ?, lease_expires = NULL, error = NULL"
+            " WHERE id = ? AND worker = ? AND status = 'leased'",
+            (output, unit_id, worker),
+        ) == 1
+
+    def release(self, unit_id, worker, error):
+        """
+        Give a unit back after a failure. It is retried until MAX_ATTEMPTS,
+        then marked failed.
+        """
+        return self._write(
+            "UPDATE units SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+            " worker = NULL, lease_expires = NULL, error = ? WHERE id = ? AND worker = ?",
+            (MAX_ATTEMPTS, error, unit_id, worker),
+        ) == 1
+
+    def acquire_request_slot(self, rate=GLOBAL_RATE):
+        """
+        Block until this worker may make a request under the global rate limit.
+
+        Every worker reserves the next free slot in the shared rate table, so
+        the combined request rate across all nodes never exceeds `rate`.
+        """
+        interval = 1.0 / rate
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                next_slot = self.conn.execute("SELECT next_slot FROM rate WHERE id = 1").fetchone()[0]
+                slot = max(time.time(), next_slot)
+                self.conn.execute("UPDATE rate SET next_slot = ? WHERE id = 1", (slot + interval,))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        wait = slot - time.time()
+        if wait > 0:
+            time.sleep(wait)
+
+    def status_counts(self):
+        rows = self.conn.execute("SELECT kind, status, COUNT(*) AS count FROM units GROUP BY kind, status")
+        return [dict(row) for row in rows]
+
+    def done_units(self, kind):
+        rows = self.conn.execute("SELECT * FROM units WHERE kind = ? AND status = 'done' ORDER BY id", (kind,))
+        return [dict(row, params=serialization.loads(row["params"])) for row in rows]
+
+
+class LeaseKeeper(threading.Thread):
+    """
+    Renews a unit's lease in the background while the worker processes it.
+    """
+
+    def __init__(self, queue, unit_id, worker):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.unit_id = unit_id
+        self.worker = worker
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        while not self.stopped.wait(self.queue.lease_seconds / 3):
+            if not self.queue.renew(self.unit_id, self.worker):
+                self.lost = True
+                return
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def process_listings(queue, params, rate):
+    fetcher = total_events.EventFetcher(
+        params["area"], f"{params['start']}T00:00:00.000Z", f"{params['end']}T23:59:59.999Z"
+    )
+
+    results = []
+    page_number = 1
+    while True:
+        queue.acquire_request_slot(rate)
+        events, total_results = fetcher.get_events(page_number)
+        if total_results is None:
+            raise RuntimeError(f"Listing request failed on page {page_number}")
+        if not events:
+            break
+
+        results.extend(
+            {"date": event["event"]["date"], "event_id": int(event["event"]["contentUrl"].split("/")[-1])}
+            for event in events
+        )
+        if len(results) >= total_results:
+            break
+        page_number += 1
+
+    return results
+
+
+def process_events(queue, params, rate):
+    results = []
+    for event_id in params["event_ids"]:
+        queue.acquire_request_slot(rate)
+        # Failed requests raise, so the unit is released and retried; only missing events are skipped
+        event = event_data.EventFetcher(event_id).get_event_details(raise_errors=True)
+        if event:
+            results.append(event_data.EventFetcher.normalize_event(event))
+    return results
+
+
+PROCESSORS = {
+    "listings": process_listings,
+    "events": process_events,
+}
+
+
+def run_worker(queue, worker, shards_dir=SHARDS_DIR, rate=GLOBAL_RATE, wait=False):
+    """
+    Claim and process units until the queue is drained.
+
+    :param queue: The WorkQueue.
+    :param worker: This worker's id.
+    :param shards_dir: Where per-unit outputs are written.
+    :param rate: The global request rate limit in requests/second.
+    :param wait: Keep polling for units leased by others instead of exiting. (default: False)
+    :return: The number of units completed by this worker.
+    """
+    os.makedirs(shards_dir, exist_ok=True)
+    completed = 0
+
+    while True:
+        unit = queue.claim(worker)
+        if unit is None:
+            if wait and any(row["status"] in ("pending", "leased") for row in queue.status_counts()):
+                time.sleep(5)
+                continue
+            break
+
+        print(f"[{worker}] Claimed unit {unit['id']} ({unit['kind']} {unit['params']}), attempt {unit['attempts'] + 1}")
+        keeper = LeaseKeeper(queue, unit["id"], worker)
+        keeper.start()
+
+        try:
+            results = PROCESSORS[unit["kind"]](queue, unit["params"], rate)
+
+            # Outputs are named by unit, not worker, so a retried unit overwrites the same file
+            output = os.path.join(shards_dir, f"{unit['kind']}-{unit['id']:06d}.json")
+            tmp_output = f"{output}.{worker}.tmp"
+            with open(tmp_output, "wb") as file:
+                file.write(serialization.dumps_bytes(results, pretty=False))
+            os.replace(tmp_output, output)
+        except Exception as e:
+            keeper.stop()
+            queue.release(unit["id"], worker, str(e))
+            print(f"[{worker}] Unit {unit['id']} failed: {e}")
+            continue
+        except KeyboardInterrupt:
+            keeper.stop()
+            queue.release(unit["id"], worker, "interrupted")
+            raise
+
+        keeper.stop()
+        if keeper.lost or not queue.complete(unit["id"], worker, output):
+            print(f"[{worker}] Lost lease on unit {unit['id']}, result discarded")
+            continue
+
+        completed += 1
+        print(f"[{worker}] Completed unit {unit['id']}: {len(results)} records")
+
+    return completed
+
+
+def merge_shards(queue, kind, output_file, area=None):
+    """
+    Merge completed unit outputs into one file, deterministically.
+
+    Records are deduplicated by event_id and sorted by date then event_id,
+    so the result does not depend on which worker ran which unit.
+
+    :param kind: "listings" (written in the events/*.json format) or "events".
+    :param area: Only merge listing units for this area (optional).
+    :return: The number of merged records.
+    """
+    records = {}
+    for unit in queue.done_units(kind):
+        if area is not None and unit["params"].get("area") != area:
+            continue
+        for record in serialization.load(unit["output"]):
+            records[str(record["event_id"])] = record
+
+    if kind == "listings":
+        merged = sorted(records.values(), key=lambda record: (record["date"], record["event_id"]))
+        merged = [dict(id=idx, **record) for idx, record in enumerate(merged)]
+    else:
+        merged = sorted(records.values(), key=lambda record: (record["event_date"], int(record["event_id"])))
+
+    serialization.dump(merged, output_file)
+
+    return len(merged)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Shard a scrape across machines with a lease-based SQLite work queue."
+    )
+    parser.add_argument("-q", "--queue", type=str, default=QUEUE_PATH, help=f"The queue database (default: {QUEUE_PATH}).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    listings_parser = subparsers.add_parser("enqueue-listings", help="Queue listing windows for an area.")
+    listings_parser.add_argument("area", type=int, help="The area code.")
+    listings_parser.add_argument("start_date", type=str, help="Start date (YYYY-MM-DD).")
+    listings_parser.add_argument("-e", "--end-date", type=str, default=None, help="End date (default: today).")
+    listings_parser.add_argument("-c", "--chunk-months", type=int, default=1, help="Window size in months (default: 1).")
+
+    events_parser = subparsers.add_parser("enqueue-events", help="Queue event ID batches from a listing file.")
+    events_parser.add_argument("events_file", type=str, help="A listing file, e.g. events/berlin.json.")
+    events_parser.add_argument("-b", "--batch-size", type=int, default=BATCH_SIZE, help=f"IDs per unit (default: {BATCH_SIZE}).")
+
+    work_parser = subparsers.add_parser("work", help="Run a worker until the queue is drained.")
+    work_parser.add_argument("-w", "--worker-id", type=str, default=f"{socket.gethostname()}-{os.getpid()}")
+    work_parser.add_argument("-d", "--shards-dir", type=str, default=SHARDS_DIR, help=f"Shard output directory (default: {SHARDS_DIR}).")
+    work_parser.add_argument("-r", "--rate", type=float, default=GLOBAL_RATE, help=f"Global requests/second (default: {GLOBAL_RATE}).")
+    work_parser.add_argument("--wait", action="store_true", help="Wait for units leased by other workers instead of exiting.")
+
+    subparsers.add_parser("status", help="Show unit counts by status.")
+
+    merge_parser = subparsers.add_parser("merge", help="Merge completed shard outputs.")
+    merge_parser.add_argument("kind", choices=sorted(PROCESSORS))
+    merge_parser.add_argument("-o", "--output", type=str, required=True, help="The merged output file.")
+    merge_parser.add_argument("-a", "--area", type=int, default=None, help="Only merge listings for this area.")
+
+    args = parser.parse_args()
+    queue = WorkQueue(args.queue)
+
+    if args.command == "enqueue-listings":
+        start_date = datetime.strptime(args.start_date, "%Y-%m-%d")
+        end_date = datetime.strptime(args.end_date, "%Y-%m-%d") if args.end_date else datetime.now()
+        chunks = total_events.generate_date_chunks(start_date, end_date, args.chunk_months)
+        added = queue.enqueue("listings", [
+            {"area": args.area, "start": start.strftime("%Y-%m-%d"), "end": end.strftime("%Y-%m-%d")}
+            for start, end in chunks
+        ])
+        print(f"Queued {added} new listing windows ({len(chunks)} total)")
+
+    elif args.command == "enqueue-events":
+        event_ids = sorted({event["event_id"] for event in serialization.load(args.events_file)})
+        batches = [event_ids[i:i + args.batch_size] for i in range(0, len(event_ids), args.batch_size)]
+        added = queue.enqueue("events", [{"event_ids": batch} for batch in batches])
+        print(f"Queued {added} new event batches ({len(event_ids)} events)")
+
+    elif args.command == "work":
+        completed = run_worker(queue, args.worker_id, args.shards_dir, args.rate, args.wait)
+        print(f"\n[{args.worker_id}] Done: completed {completed} units")
+
+    elif args.command == "status":
+        for row in queue.status_counts():
+            print(f"{row['kind']:<10} {row['status']:<8} {row['count']}")
+
+    elif args.command == "merge":
+        count = merge_shards(queue, args.kind, args.output, args.area)
+        print(f"Merged {count} records into {args.output}")
+
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()